@@ -1,68 +1,30 @@
 import streamlit as st
 from datetime import datetime
-from utils.ibm_api import call_ibm_model
-from utils.file_utils import save_chat, load_chat, list_chats, get_unique_chat_id, sanitize_filename
-import fitz
-from PIL import Image
-import pytesseract
-
-MAX_TOTAL_TOKENS = 4096
-MAX_OUTPUT_TOKENS = 4096
-
-def estimate_tokens(text):
-    return int(len(text) / 4)
+from utils.ibm_api import call_ibm_model, stream_ibm_model, queue_status
+from utils.gateway import PRIORITY_INTERACTIVE
+from utils.file_utils import append_chat, load_chat, list_chats, get_unique_chat_id, sanitize_filename
+from utils import pdf_utils, prompt_builder
+from utils.token_budget import count_tokens
+from utils.retrieval import select_context
+from utils.chat_summary import load_summary, maybe_summarize
+from utils.tracing import traced_iter
+
+MAX_TOTAL_TOKENS = 8192
+MAX_OUTPUT_TOKENS = 2048
+MAX_DOCUMENT_TOKENS = 250000
 
 def extract_text_from_pdf(file):
-    text = ""
-    with fitz.open(stream=file.read(), filetype="pdf") as doc:
-        for page in doc:
-            text += page.get_text()
-    return text.strip()
+    # The whole document is indexed for retrieval, so only very long books are cut short.
+    return pdf_utils.extract_text_from_pdf(file, max_tokens=MAX_DOCUMENT_TOKENS).strip()
 
 def extract_text_from_image(file):
     try:
-        image = Image.open(file)
-        return pytesseract.image_to_string(image)
+        return pdf_utils.extract_text_from_image(file)
     except Exception:
         return "❌ Image extraction failed try again."
 
-def build_prompt(history, user_input, context=""):
-    prompt_parts = []
-    available_tokens = MAX_TOTAL_TOKENS - MAX_OUTPUT_TOKENS - estimate_tokens(user_input)
-
-    if context:
-        ctx_tokens = estimate_tokens(context)
-        if ctx_tokens > available_tokens:
-            words = context.split()
-            trimmed = []
-            for word in words:
-                test = " ".join(trimmed + [word])
-                if estimate_tokens(test) < available_tokens:
-                    trimmed.append(word)
-                else:
-                    break
-            context = " ".join(trimmed)
-        prompt_parts.append(context)
-        available_tokens -= estimate_tokens(context)
-
-    trimmed_history = []
-    for msg in reversed(history):
-        if msg["role"] in ("user", "assistant"):
-            content = msg["content"]
-            tokens = estimate_tokens(content)
-            if tokens <= available_tokens:
-                trimmed_history.insert(0, content)
-                available_tokens -= tokens
-            else:
-                break
-    prompt_parts.extend(trimmed_history)
-
-    user_input = user_input.strip()
-    if not user_input.endswith("."):
-        user_input += "."
-    prompt_parts.append(user_input)
-
-    return "\n\n".join(prompt_parts)
+def build_prompt(history, user_input, context="", summary=""):
+    return prompt_builder.build_prompt(history, user_input, context, MAX_TOTAL_TOKENS, MAX_OUTPUT_TOKENS, summary)
 
 def show():
     st.title("💬 Ask Me")
@@ -107,12 +69,17 @@ def show():
 
     user_input = st.chat_input("Ask me anything...")
 
+    for msg in st.session_state.askme_history:
+        with st.chat_message(msg["role"]):
+            st.markdown(msg["content"])
+
     if user_input:
+        status = st.empty()
         if not st.session_state["current_chat_id"]:
             with st.spinner("🔤 Generating title..."):
                 try:
                     title_prompt = f"Generate a short, meaningful title (max 5 words) summarizing this request: {user_input}"
-                    title = call_ibm_model(title_prompt, max_tokens=20, temperature=0.3).strip()
+                    title = call_ibm_model(title_prompt, max_tokens=20, temperature=0.3, user=user, priority=PRIORITY_INTERACTIVE, on_wait=queue_status(status), task="title").strip()
                     title = sanitize_filename(title)
                     chat_id = get_unique_chat_id(user, title)
                     st.session_state["current_chat_id"] = chat_id
@@ -121,19 +88,25 @@ def show():
                     fallback = datetime.now().strftime("%Y-%m-%dT%H-%M-%S")
                     st.session_state["current_chat_id"] = f"Chat_{fallback}"
                     st.session_state["previous_chat"] = st.session_state["current_chat_id"]
+            status.empty()
 
-        prompt = build_prompt(st.session_state.askme_history, user_input, context=extra_text)
-        if estimate_tokens(prompt) > MAX_TOTAL_TOKENS:
+        context = select_context(extra_text, user_input) if extra_text else ""
+        summary, covered = load_summary(user, st.session_state["current_chat_id"])
+        prompt = build_prompt(st.session_state.askme_history[covered:], user_input, context=context, summary=summary)
+        if count_tokens(prompt) > MAX_TOTAL_TOKENS:
             st.warning("⚠️ Token limit exceeded. Start a new chat or shorten input.")
         else:
-            with st.spinner("🤖 Thinking..."):
-                response = call_ibm_model(prompt, max_tokens=MAX_OUTPUT_TOKENS, temperature=0.2)
+            with st.chat_message("user"):
+                st.markdown(user_input)
+            with st.chat_message("assistant"):
+                response = st.write_stream(traced_iter("askme.generate", stream_ibm_model(
+                    prompt, max_tokens=MAX_OUTPUT_TOKENS, temperature=0.2,
+                    user=user, priority=PRIORITY_INTERACTIVE, on_wait=queue_status(status), task="chat"
+                )))
                 response = response.strip() if response else "⚠️ No response."
+            status.empty()
 
-            st.session_state.askme_history.append({"role": "user", "content": user_input})
-            st.session_state.askme_history.append({"role": "assistant", "content": response})
-            save_chat(user, st.session_state["current_chat_id"], st.session_state.askme_history)
-
-    for msg in st.session_state.askme_history:
-        with st.chat_message(msg["role"]):
-            st.markdown(msg["content"])
+            turn = [{"role": "user", "content": user_input}, {"role": "assistant", "content": response}]
+            st.session_state.askme_history.extend(turn)
+            append_chat(user, st.session_state["current_chat_id"], turn)
+            maybe_summarize(user, st.session_state["current_chat_id"], st.session_state.askme_history)
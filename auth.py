@@ -1,23 +1,15 @@
-import hashlib
-from utils.file_utils import load_json, save_json
-USER_FILE = "data/users.json"
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
+from utils.passwords import hash_password, verify_password
+from utils.user_store import add_user, get_password_hash, update_password_hash
+from utils.tracing import traced
+@traced("auth.register")
 def register_user(email, password):
-    users = load_json(USER_FILE)
-    for user in users:
-        if user["email"] == email:
-            return False
-    users.append({
-        "email": email,
-        "password": hash_password(password)
-    })
-    save_json(USER_FILE, users)
-    return True
+    return add_user(email, hash_password(password))
+@traced("auth.login")
 def login_user(email, password):
-    users = load_json(USER_FILE)
-    hashed = hash_password(password)
-    for user in users:
-        if user["email"] == email and user["password"] == hashed:
-            return True
-    return False
\ No newline at end of file
+    stored = get_password_hash(email)
+    if stored is None:
+        return False
+    ok, needs_upgrade = verify_password(password, stored)
+    if ok and needs_upgrade:
+        update_password_hash(email, hash_password(password))
+    return ok
@@ -0,0 +1,49 @@
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+sys.path.insert(0, ".")
+from utils import analytics, result_store
+USERS = 10_000
+RESULTS_PER_USER = 100
+TOPICS = [f"topic-{i}" for i in range(200)]
+DIFFICULTIES = ["Easy", "Medium", "Hard"]
+def make_dataset(quiz_dir, users, per_user):
+    rng = random.Random(42)
+    os.makedirs(quiz_dir, exist_ok=True)
+    for u in range(users):
+        with open(os.path.join(quiz_dir, f"student{u}@school.edu.jsonl"), "w", encoding="utf-8") as f:
+            for _ in range(per_user):
+                total = rng.choice([5, 10, 20])
+                f.write(json.dumps({
+                    "timestamp": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:00",
+                    "topic": rng.choice(TOPICS),
+                    "difficulty": rng.choice(DIFFICULTIES),
+                    "total_questions": total,
+                    "score": rng.randint(0, total)
+                }) + "\n")
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"{label:<40} {(time.perf_counter() - start) * 1000:10.1f} ms")
+    return result
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else USERS
+    per_user = int(sys.argv[2]) if len(sys.argv) > 2 else RESULTS_PER_USER
+    with tempfile.TemporaryDirectory() as root:
+        result_store.QUIZ_DIR = os.path.join(root, "quizzes")
+        analytics.ANALYTICS_DIR = os.path.join(root, "analytics")
+        timed(f"generate {users * per_user} results", lambda: make_dataset(result_store.QUIZ_DIR, users, per_user))
+        timed("initial ingest", analytics.refresh)
+        for query in ("topic_difficulty", "score_distribution", "daily_activity"):
+            timed(f"{query} (cold)", lambda: analytics.run_query(query, refresh_first=False))
+            timed(f"{query} (cached)", lambda: analytics.run_query(query, refresh_first=False))
+        result_store.append_result("student0@school.edu", {
+            "timestamp": "2025-06-01 10:00", "topic": TOPICS[0], "difficulty": "Easy", "total_questions": 5, "score": 5
+        })
+        timed("incremental refresh after one result", analytics.refresh)
+        timed("topic_difficulty after refresh", lambda: analytics.run_query("topic_difficulty", refresh_first=False))
+if __name__ == "__main__":
+    main()
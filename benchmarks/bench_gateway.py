@@ -0,0 +1,150 @@
+import random
+import sys
+import threading
+import time
+sys.path.insert(0, ".")
+from utils import gateway as gateway_module
+from utils.gateway import Gateway, MAX_RETRIES
+LOAD_CALLERS = 64
+LOAD_FAILURE_RATE = 0.2
+SERVICE_SECONDS = 0.005
+class BackendError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+class FakeBackend:
+    # Serves requests after a fixed delay; `script` lists status codes to fail with before succeeding,
+    # otherwise failures are drawn at `failure_rate`.
+    def __init__(self, script=(), failure_rate=0.0, seed=0):
+        self.script = list(script)
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.active = 0
+        self.peak = 0
+    def generate(self):
+        with self.lock:
+            self.calls += 1
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            status = self.script.pop(0) if self.script else (
+                self.rng.choice([429, 500, 503]) if self.rng.random() < self.failure_rate else 200
+            )
+        try:
+            time.sleep(SERVICE_SECONDS)
+            if status != 200:
+                raise BackendError(status)
+            return "ok"
+        finally:
+            with self.lock:
+                self.active -= 1
+def wait_for_queue(gw, length):
+    deadline = time.monotonic() + 5
+    while gw.snapshot()["queued"] < length:
+        assert time.monotonic() < deadline, "callers never queued"
+        time.sleep(0.001)
+def check_priority_order():
+    gw = Gateway(max_concurrent=1)
+    gw.acquire()
+    order = []
+    def caller(priority, n):
+        gw.acquire(priority=priority)
+        order.append((priority, n))
+        gw.release()
+    priorities = [10, 5, 0, 10, 0, 5]
+    threads = []
+    for n, priority in enumerate(priorities):
+        threads.append(threading.Thread(target=caller, args=(priority, n)))
+        threads[-1].start()
+        wait_for_queue(gw, n + 1)
+    gw.release()
+    for t in threads:
+        t.join()
+    assert order == sorted(order), f"admitted out of priority order: {order}"
+    print(f"priority: {len(order)} queued callers admitted in order {[p for p, _ in order]}")
+def check_token_bucket():
+    rate, burst, calls = 20.0, 5, 15
+    gw = Gateway(rate=rate, burst=burst)
+    start = time.monotonic()
+    for _ in range(calls):
+        gw.acquire(user="heavy")
+        gw.release()
+    heavy = time.monotonic() - start
+    start = time.monotonic()
+    gw.acquire(user="light")
+    gw.release()
+    light = time.monotonic() - start
+    expected = (calls - burst) / rate
+    assert heavy >= expected * 0.9, f"{calls} calls took {heavy:.2f}s, bucket allows {expected:.2f}s"
+    assert light < 0.05, f"another user waited {light:.2f}s behind the throttled one"
+    assert gw.snapshot()["rate_limited"] == calls - burst
+    print(f"token bucket: {calls} calls at {rate:.0f}/s burst {burst} took {heavy:.2f}s (floor {expected:.2f}s); other user {light * 1000:.1f} ms")
+def check_retries():
+    cases = [
+        ("429 then 503", [429, 503], "ok", 3),
+        ("400", [400], BackendError, 1),
+        ("5xx every time", [500] * (MAX_RETRIES + 1), BackendError, MAX_RETRIES + 1),
+    ]
+    for name, script, outcome, expected_calls in cases:
+        gw = Gateway()
+        backend = FakeBackend(script)
+        try:
+            result = gw.call(backend.generate)
+        except BackendError as e:
+            result = type(e)
+        assert result == outcome, f"{name}: got {result!r}"
+        assert backend.calls == expected_calls, f"{name}: {backend.calls} upstream calls, expected {expected_calls}"
+        print(f"retries: {name:<16} -> {outcome if outcome == 'ok' else 'raised'} after {backend.calls} calls")
+def check_abandoned_waiter():
+    # A waiter whose on_wait raises (a Streamlit rerun, Ctrl-C) must leave the queue usable.
+    gw = Gateway(max_concurrent=1)
+    gw.acquire()
+    def interrupt(position, wait):
+        raise KeyboardInterrupt
+    try:
+        gw.acquire(priority=0, on_wait=interrupt)
+    except KeyboardInterrupt:
+        pass
+    assert gw.snapshot()["queued"] == 0, "interrupted waiter left its entry in the queue"
+    done = threading.Event()
+    def later():
+        gw.acquire(priority=5)
+        gw.release()
+        done.set()
+    threading.Thread(target=later, daemon=True).start()
+    gw.release()
+    assert done.wait(2), "queue stuck behind an abandoned waiter"
+    print("abandoned waiter: queue drained after on_wait raised")
+def check_load():
+    gw = Gateway(max_concurrent=4)
+    backend = FakeBackend(failure_rate=LOAD_FAILURE_RATE, seed=1)
+    results = []
+    def caller(n):
+        try:
+            results.append(gw.call(backend.generate, user=f"user{n % 8}", priority=n % 3 * 5))
+        except BackendError:
+            results.append("failed")
+    start = time.perf_counter()
+    threads = [threading.Thread(target=caller, args=(n,)) for n in range(LOAD_CALLERS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    stats = gw.snapshot()
+    assert len(results) == LOAD_CALLERS and stats["active"] == 0 and stats["queued"] == 0
+    assert backend.peak <= gw.max_concurrent, f"{backend.peak} concurrent upstream calls"
+    print(
+        f"load: {LOAD_CALLERS} callers, {backend.calls} upstream calls, {stats['retries']} retries, "
+        f"{results.count('failed')} failed, peak concurrency {backend.peak}, {elapsed:.2f}s"
+    )
+def main():
+    gateway_module.BACKOFF_BASE_SECONDS = 0.001
+    check_priority_order()
+    check_token_bucket()
+    check_retries()
+    check_abandoned_waiter()
+    check_load()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import argparse
+import http.server
+import json
+import os
+import random
+import re
+import string
+import sys
+import tempfile
+import threading
+import time
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from utils import tracing
+RESULTS_FILE = os.path.join(ROOT, "benchmarks", "results", "pages.json")
+ITERATIONS = 30
+STUB_SECONDS_PER_TOKEN = 0.0005
+REGRESSION_RATIO = 1.25
+REGRESSION_MIN_MS = 1.0
+def words(rng, count):
+    return " ".join("".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 9))) for _ in range(count))
+def stub_text(prompt, max_tokens):
+    # Answers in the shape each page expects, sized to the requested output.
+    rng = random.Random(prompt)
+    if "multiple choice" in prompt:
+        count = int(re.search(r"generate (\d+) MCQs", prompt).group(1))
+        return "\n".join(
+            f"Q{i}. {words(rng, 10)}?\nA) {words(rng, 2)}\nB) {words(rng, 2)}\nC) {words(rng, 2)}\nD) {words(rng, 2)}\nAnswer: {rng.choice('ABCD')}\n"
+            for i in range(1, count + 1)
+        )
+    return words(rng, min(max_tokens, 200))
+class StubModel:
+    def __init__(self, max_tokens):
+        self.max_tokens = max_tokens
+    def generate(self, prompt):
+        text = stub_text(prompt, self.max_tokens)
+        time.sleep(len(text) / 4 * STUB_SECONDS_PER_TOKEN)
+        return {"results": [{"generated_text": text, "generated_token_count": len(text) // 4}]}
+    def generate_text_stream(self, prompt):
+        text = stub_text(prompt, self.max_tokens)
+        for i in range(0, len(text), 16):
+            time.sleep(4 * STUB_SECONDS_PER_TOKEN)
+            yield text[i:i + 16]
+class SearchHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = "".join(
+            f'<div><a class="result__a" href="/l/?uddg=https%3A%2F%2Fexample.com%2F{i}">Result {i}</a></div>' for i in range(30)
+        ).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    def log_message(self, *args):
+        pass
+def install_stub_backend():
+    from utils import ibm_api
+    ibm_api.get_model = lambda model_id, params: StubModel(params["max_new_tokens"])
+def bench_auth(size):
+    import auth
+    users = [f"user{i}@bench.test" for i in range(size)]
+    for email in users:
+        auth.register_user(email, "correct horse")
+    return lambda i: auth.login_user(users[i % size], "correct horse")
+def bench_askme(size):
+    from utils import prompt_builder
+    from utils.chat_summary import maybe_summarize
+    from utils.file_utils import append_chat
+    from utils.ibm_api import stream_ibm_model
+    from utils.retrieval import select_context
+    rng = random.Random(size)
+    document = words(rng, size)
+    history = []
+    def turn(i):
+        question = f"question {i}: {words(rng, 8)}?"
+        context = select_context(document, question)
+        prompt = prompt_builder.build_prompt(history, question, context, 8192, 2048)
+        response = "".join(stream_ibm_model(prompt, max_tokens=200, user="bench", task="chat"))
+        messages = [{"role": "user", "content": question}, {"role": "assistant", "content": response}]
+        history.extend(messages)
+        append_chat("bench@bench.test", "bench-chat", messages)
+        maybe_summarize("bench@bench.test", "bench-chat", history)
+    return turn
+def bench_quiz(size):
+    from utils import question_bank
+    from utils.quiz_generator import generate_questions
+    def run(i):
+        topic = f"topic {i}"
+        questions, _ = generate_questions(topic, "Easy", size, user="bench")
+        question_bank.add_questions(question_bank.topic_key(topic), "Easy", "", questions, user="bench")
+    return run
+def bench_quiz_bank(size):
+    from utils import question_bank
+    rng = random.Random(size)
+    bank = [{"question": words(rng, 10), "options": [words(rng, 2) for _ in range(4)], "answer": ""} for _ in range(size)]
+    question_bank.add_questions("popular", "Easy", "", bank)
+    return lambda i: question_bank.draw(f"student{i}", "popular", "Easy", "", 20)
+def bench_resources(size):
+    import resources
+    from utils.ibm_api import call_ibm_model
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), SearchHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    resources.SEARCH_URL = f"http://127.0.0.1:{server.server_port}/html/"
+    def run(i):
+        topic = f"topic {i % size}"
+        ai = resources._executor.submit(call_ibm_model, f"List 5 resources about: {topic}", max_tokens=200, user="bench", task="resources")
+        links = resources._executor.submit(resources.web_search, f"{topic} tutorial")
+        resources.append_history("bench", {"topic": topic, "ai_response": ai.result(), "links": links.result()})
+        resources.load_history("bench")
+    return run
+def bench_dashboard(size):
+    from utils import result_store
+    rng = random.Random(size)
+    for _ in range(size):
+        result_store.append_result("bench", {
+            "timestamp": "2025-01-01 10:00", "topic": f"topic-{rng.randint(0, 50)}", "difficulty": rng.choice(["Easy", "Medium", "Hard"]),
+            "total_questions": 10, "score": rng.randint(0, 10)
+        })
+    def run(i):
+        result_store.load_summary("bench")
+        result_store.read_results_page("bench", i % max(1, size // 20), 20)
+    return run
+def bench_cohort(size):
+    from utils import analytics
+    bench_dashboard(size)
+    return lambda i: analytics.run_query("topic_difficulty")
+# Scenario name -> (setup, synthetic data sizes). Setup builds the data and returns the timed step.
+SCENARIOS = {
+    "auth.login": (bench_auth, [10]),
+    "askme.turn": (bench_askme, [1_000, 100_000]),
+    "quiz.generate": (bench_quiz, [5, 50]),
+    "quiz.bank_draw": (bench_quiz_bank, [1_000, 100_000]),
+    "resources.search": (bench_resources, [5]),
+    "dashboard.history": (bench_dashboard, [100, 10_000]),
+    "dashboard.cohort": (bench_cohort, [1_000]),
+}
+def percentiles(samples):
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+    return {"p50": pick(50), "p95": pick(95), "p99": pick(99)}
+def run_scenario(setup, size, iterations):
+    step = setup(size)
+    step(-1)
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        step(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    return percentiles(samples)
+def compare(results, baseline):
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if not previous:
+            continue
+        for q in ("p50", "p95", "p99"):
+            if current[q] > previous[q] * REGRESSION_RATIO and current[q] - previous[q] > REGRESSION_MIN_MS:
+                regressions.append(f"{key} {q}: {previous[q]:.1f} ms -> {current[q]:.1f} ms")
+    return regressions
+def main():
+    parser = argparse.ArgumentParser(description="Drive each page's logic against a stub model backend.")
+    parser.add_argument("--iterations", type=int, default=ITERATIONS)
+    parser.add_argument("--only", nargs="*", default=list(SCENARIOS))
+    parser.add_argument("--results", default=RESULTS_FILE, help="where this run is saved; the previous run there is the baseline")
+    args = parser.parse_args()
+    baseline = {}
+    if os.path.exists(args.results):
+        with open(args.results, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    results = {}
+    workdir = tempfile.mkdtemp(prefix="bench-pages-")
+    os.chdir(workdir)
+    tracing.TRACE_FILE = None
+    try:
+        install_stub_backend()
+    except ImportError as e:
+        print(f"stub backend unavailable: {e}")
+    print(f"{'scenario':<28} {'size':>8} {'p50':>10} {'p95':>10} {'p99':>10}")
+    for name in args.only:
+        setup, sizes = SCENARIOS[name]
+        for size in sizes:
+            try:
+                stats = run_scenario(setup, size, args.iterations)
+            except ImportError as e:
+                print(f"{name:<28} {size:>8}  skipped: {e}")
+                break
+            results[f"{name}[{size}]"] = stats
+            print(f"{name:<28} {size:>8} {stats['p50']:>8.1f}ms {stats['p95']:>8.1f}ms {stats['p99']:>8.1f}ms")
+    print()
+    tracing.report(tracing.snapshot()["spans"])
+    regressions = compare(results, baseline)
+    os.makedirs(os.path.dirname(args.results), exist_ok=True)
+    with open(args.results, "w", encoding="utf-8") as f:
+        json.dump(dict(baseline, **results), f, indent=2)
+    if regressions:
+        print("\nRegressions against the previous run:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+if __name__ == "__main__":
+    main()
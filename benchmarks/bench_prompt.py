@@ -0,0 +1,30 @@
+import random
+import string
+import sys
+import time
+sys.path.insert(0, ".")
+from utils.prompt_builder import build_prompt
+SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+def make_context(size):
+    rng = random.Random(size)
+    words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 10))) for _ in range(1000)]
+    parts = []
+    length = 0
+    while length < size:
+        word = rng.choice(words)
+        parts.append(word)
+        length += len(word) + 1
+    return " ".join(parts)
+def main():
+    history = [{"role": "user" if i % 2 == 0 else "assistant", "content": "hello " * 50} for i in range(200)]
+    previous = None
+    for size in SIZES:
+        context = make_context(size)
+        start = time.perf_counter()
+        build_prompt(history, "What is this about?", context, max_total_tokens=8192, max_output_tokens=1024)
+        elapsed = time.perf_counter() - start
+        ratio = f"  x{elapsed / previous:.1f}" if previous else ""
+        print(f"{size / 1000:>8.0f} KB  {elapsed * 1000:9.2f} ms{ratio}")
+        previous = elapsed
+if __name__ == "__main__":
+    main()
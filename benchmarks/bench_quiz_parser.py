@@ -0,0 +1,116 @@
+import random
+import re
+import sys
+import time
+sys.path.insert(0, ".")
+from utils.quiz_parser import QuestionStream, parse_quiz
+SIZES = [100, 1_000, 10_000]
+FUZZ_SEEDS = range(50)
+FUZZ_QUESTIONS = 200
+CORRUPT_RATE = 0.1
+# The regex parser this module replaced, kept as the baseline.
+LEGACY_PATTERN = re.compile(
+    r"Q\d+\.\s*(.*?)\nA\)\s*(.*?)\nB\)\s*(.*?)\nC\)\s*(.*?)\nD\)\s*(.*?)\nAnswer:\s*([A-Da-d])",
+    re.MULTILINE | re.DOTALL
+)
+def legacy_parse(text):
+    text = re.sub(r"\n\s+", "\n", re.sub(r"\r", "", text))
+    return LEGACY_PATTERN.findall(text)
+def make_word(rng):
+    return "".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(2, 9)))
+def make_question(rng, number, variants):
+    question = " ".join(make_word(rng) for _ in range(rng.randint(4, 14))) + "?"
+    options = [f"{make_word(rng)} {make_word(rng)} {i}" for i in range(4)]
+    correct = rng.randrange(4)
+    if not variants:
+        lines = [f"Q{number}. {question}"] + [f"{'ABCD'[i]}) {o}" for i, o in enumerate(options)] + [f"Answer: {'ABCD'[correct]}"]
+        return lines, {"question": question, "options": options, "answer": options[correct]}
+    space = " " * rng.randint(0, 3)
+    label = rng.choice(["Q{}.", "{}.", "Question {}:", "**Q{}.**", "q{})"]).format(number)
+    letters = rng.choice(["ABCD", "abcd"])
+    style = rng.choice(["{}) ", "{}. ", "({}) ", "{}: "])
+    if rng.random() < 0.2:
+        # Options that open with an article, so a spelled answer starts like a letter ("Answer: a ...").
+        options = [f"{rng.choice(['a', 'A', 'an'])} {o}" for o in options]
+    stem = f"{space}{label}{space} {question}"
+    if rng.random() < 0.2:
+        # "Which statements are true?" stems list numbered lines before the options. They share the block's
+        # first list entry so corruptions still index the options by position.
+        statements = [f"{i}. {make_word(rng)} {make_word(rng)}" for i in range(1, rng.randint(2, 4))]
+        stem = "\n".join([stem] + [f"{space}{line}" for line in statements])
+        question = " ".join([question] + statements)
+    lines = [stem]
+    lines += [f"{space}{style.format(letters[i])}{space}{o}{space}" for i, o in enumerate(options)]
+    answer = rng.choice([
+        f"Answer: {letters[correct]}", f"**Answer:** {letters[correct]}", f"Answer: {options[correct]}",
+        f"Correct answer - {letters[correct]})", f"Answer: {letters[correct]}. {options[correct]}",
+        f"Answer: {letters[correct]} - {options[correct]}", f"Answer: {letters[correct]} ({options[correct]})",
+        f"Answer: {letters[correct]}, {options[correct]}", f"Answer: {letters[correct]} is correct",
+        f"Answer: {letters[correct]}\u2014{options[correct]}"
+    ])
+    lines.append(f"{space}{answer}")
+    return lines, {"question": question, "options": options, "answer": options[correct]}
+def corrupt(rng, lines):
+    kind = rng.choice(["drop_option", "drop_answer", "swap_options", "bad_answer"])
+    if kind == "drop_option":
+        del lines[rng.randint(1, 4)]
+    elif kind == "drop_answer":
+        del lines[-1]
+    elif kind == "swap_options":
+        lines[1], lines[2] = lines[2], lines[1]
+    else:
+        lines[-1] = "Answer: none of these"
+    return lines
+def make_output(seed, num_questions, variants=True, corrupt_rate=CORRUPT_RATE):
+    rng = random.Random(seed)
+    lines = ["Sure! Here are your questions:", ""] if variants else []
+    expected, rejected = [], 0
+    for number in range(1, num_questions + 1):
+        block, question = make_question(rng, number, variants)
+        if variants and rng.random() < corrupt_rate:
+            block = corrupt(rng, block)
+            rejected += 1
+        else:
+            expected.append(question)
+        lines += block + [""] * (rng.randint(0, 2) if variants else 1)
+    newline = "\r\n" if variants and rng.random() < 0.2 else "\n"
+    return newline.join(lines), expected, rejected
+def stream_chunks(rng, text, low=1, high=12):
+    i = 0
+    while i < len(text):
+        size = rng.randint(low, high)
+        yield text[i:i + size]
+        i += size
+def parse_stream(chunks):
+    stream = QuestionStream()
+    questions = []
+    for chunk in chunks:
+        questions.extend(stream.feed(chunk))
+    questions.extend(stream.finish())
+    return questions, stream.rejected
+def fuzz():
+    for seed in FUZZ_SEEDS:
+        text, expected, rejected = make_output(seed, FUZZ_QUESTIONS)
+        questions, rejects = parse_quiz(text)
+        assert questions == expected, f"seed {seed}: parsed {len(questions)} of {len(expected)} questions"
+        assert len(rejects) == rejected, f"seed {seed}: {len(rejects)} rejected blocks, expected {rejected}"
+        streamed, _ = parse_stream(stream_chunks(random.Random(seed), text))
+        assert streamed == questions, f"seed {seed}: streamed parse differs from whole-text parse"
+    print(f"fuzz: {len(FUZZ_SEEDS)} outputs x {FUZZ_QUESTIONS} questions ok")
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+def main():
+    fuzz()
+    print(f"{'questions':>10} {'legacy':>12} {'whole text':>12} {'streamed':>12}")
+    for size in SIZES:
+        text, expected, _ = make_output(size, size, variants=False)
+        legacy, legacy_ms = timed(lambda: legacy_parse(text))
+        (questions, _), whole_ms = timed(lambda: parse_quiz(text))
+        chunks = list(stream_chunks(random.Random(size), text, 2, 8))
+        (streamed, _), stream_ms = timed(lambda: parse_stream(chunks))
+        assert len(legacy) == len(questions) == len(streamed) == len(expected)
+        print(f"{size:>10} {legacy_ms:>9.1f} ms {whole_ms:>9.1f} ms {stream_ms:>9.1f} ms")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import os
+import sys
+import tempfile
+import time
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from utils import tracing
+from utils.quiz_parser import QuestionStream
+NUM_QUESTIONS = 5
+CHUNK_CHARS = 16
+CHUNK_DELAY_SECONDS = 0.005
+def quiz_text(num_questions):
+    return "".join(
+        f"Q{i}. Which of these is option {'ABCD'[i % 4]} in round {i}?\nA) first {i}\nB) second {i}\nC) third {i}\nD) fourth {i}\nAnswer: {'ABCD'[i % 4]}\n\n"
+        for i in range(1, num_questions + 1)
+    )
+class ScriptedModel:
+    # Emits the quiz in fixed-size chunks on a delay and notes when the last chunk went out.
+    def __init__(self, text):
+        self.text = text
+        self.last_sent = None
+    def generate_text_stream(self, prompt):
+        for i in range(0, len(self.text), CHUNK_CHARS):
+            time.sleep(CHUNK_DELAY_SECONDS)
+            if i + CHUNK_CHARS >= len(self.text):
+                self.last_sent = time.perf_counter()
+            yield self.text[i:i + CHUNK_CHARS]
+def model_stream(model):
+    # The page's path: stream_ibm_model through the gateway and single-flight, with the fake as the backend.
+    try:
+        from utils import ibm_api
+        from utils.quiz_generator import build_quiz_prompt, TOKENS_PER_QUESTION
+    except ImportError as e:
+        print(f"ibm_api unavailable ({e}); reading the scripted stream directly")
+        return model.generate_text_stream("")
+    ibm_api.get_model = lambda model_id, params: model
+    prompt = build_quiz_prompt("streaming", "Easy", NUM_QUESTIONS)
+    max_tokens = NUM_QUESTIONS * TOKENS_PER_QUESTION + TOKENS_PER_QUESTION
+    return ibm_api.stream_ibm_model(prompt, max_tokens=max_tokens, user="bench", task="quiz", use_cache=False, sample=True)
+def main():
+    os.chdir(tempfile.mkdtemp(prefix="bench-quiz-stream-"))
+    tracing.TRACE_FILE = None
+    model = ScriptedModel(quiz_text(NUM_QUESTIONS))
+    start = time.perf_counter()
+    arrivals = []
+    question_stream = QuestionStream()
+    for chunk in model_stream(model):
+        arrivals += [time.perf_counter()] * len(question_stream.feed(chunk))
+    arrivals += [time.perf_counter()] * len(question_stream.finish())
+    assert len(arrivals) == NUM_QUESTIONS, f"parsed {len(arrivals)} of {NUM_QUESTIONS} questions"
+    assert model.last_sent is not None and arrivals[0] < model.last_sent, "question 1 only arrived after the stream ended"
+    print(f"first question after {(arrivals[0] - start) * 1000:.1f} ms, last chunk sent after {(model.last_sent - start) * 1000:.1f} ms")
+    print("arrivals: " + ", ".join(f"{(t - start) * 1000:.0f}" for t in arrivals) + " ms")
+if __name__ == "__main__":
+    main()
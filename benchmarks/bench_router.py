@@ -0,0 +1,61 @@
+import random
+import sys
+from collections import Counter
+sys.path.insert(0, ".")
+from utils import model_selector
+from utils.model_selector import choose_best_model, explore, record_latency, PREFILL_SPEEDUP, SUPPORTED_MODELS
+WINDOW = 100
+PROMPT_TOKENS = 1_000
+OUTPUT_TOKENS = 400
+SLOWDOWN = 4.0
+JITTER = 0.1
+# (phase, requests, tokens-per-second multiplier for the slowed model)
+PHASES = [("normal", 300, 1.0), ("slowed", 600, 1 / SLOWDOWN), ("recovered", 600, 1.0)]
+class SimulatedBackend:
+    # Virtual clock: each request "takes" the time its model would need, so the scenario runs instantly.
+    def __init__(self, rng):
+        self.rng = rng
+        self.speeds = {m["id"]: m["tokens_per_second"] for m in SUPPORTED_MODELS}
+    def serve(self, model_id):
+        rate = self.speeds[model_id]
+        elapsed = (PROMPT_TOKENS / (rate * PREFILL_SPEEDUP) + OUTPUT_TOKENS / rate) * self.rng.uniform(1 - JITTER, 1 + JITTER)
+        record_latency(model_id, elapsed, OUTPUT_TOKENS)
+        return elapsed
+def short(model_id):
+    return model_id.split("/")[-1]
+def main():
+    rng = random.Random(0)
+    random.seed(0)
+    backend = SimulatedBackend(rng)
+    prompt = "word " * (PROMPT_TOKENS * 4 // 5)
+    # Identical prompts must map to one cache and single-flight key; exploration only changes who serves them.
+    keys = {choose_best_model(prompt, OUTPUT_TOKENS, "chat") for _ in range(1_000)}
+    assert len(keys) == 1, f"identical prompts were keyed on {len(keys)} models"
+    slowed = keys.pop()
+    nominal = backend.speeds[slowed]
+    ids = [m["id"] for m in SUPPORTED_MODELS]
+    print(f"slowing {short(slowed)} by {SLOWDOWN:.0f}x in the middle phase")
+    print(f"{'phase':<10} {'requests':>9} " + " ".join(f"{short(i):>22}" for i in ids) + f" {'mean s':>8}")
+    shares = {}
+    served = 0
+    for phase, requests, multiplier in PHASES:
+        backend.speeds[slowed] = nominal * multiplier
+        for start in range(0, requests, WINDOW):
+            window = Counter()
+            total = 0.0
+            for _ in range(WINDOW):
+                # What ibm_api does on a cache miss: the policy choice keys caches, explore picks the server.
+                model_id = choose_best_model(prompt, OUTPUT_TOKENS, "chat")
+                served_id = explore(model_id, prompt, OUTPUT_TOKENS)
+                window[served_id] += 1
+                total += backend.serve(served_id)
+            served += WINDOW
+            shares[phase] = window[slowed] / WINDOW
+            print(f"{phase:<10} {served:>9} " + " ".join(f"{window[i] / WINDOW:>21.0%} " for i in ids) + f" {total / WINDOW:>8.1f}")
+    stats = model_selector.get_model_stats()
+    print("\nobserved tokens/s: " + ", ".join(f"{short(i)} {s['tokens_per_second']:.1f}" for i, s in stats.items()))
+    assert shares["normal"] > 0.85, f"{short(slowed)} only served {shares['normal']:.0%} before the slowdown"
+    assert shares["slowed"] < 0.1, f"{short(slowed)} still served {shares['slowed']:.0%} while slowed"
+    assert shares["recovered"] > 0.85, f"{short(slowed)} only served {shares['recovered']:.0%} after recovering"
+if __name__ == "__main__":
+    main()
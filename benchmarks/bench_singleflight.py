@@ -0,0 +1,101 @@
+import sys
+import threading
+import time
+sys.path.insert(0, ".")
+from utils.gateway import Gateway
+from utils.singleflight import Group
+BURST_CALLERS = 200
+BURST_KEYS = 5
+SERVICE_SECONDS = 0.05
+class StubBackend:
+    def __init__(self, ready=None):
+        self.ready = ready
+        self.lock = threading.Lock()
+        self.calls = 0
+    def generate(self, key):
+        with self.lock:
+            self.calls += 1
+        # Holding the first call until the whole burst has arrived makes the coalescing count deterministic.
+        if self.ready:
+            self.ready()
+        time.sleep(SERVICE_SECONDS)
+        return f"answer to {key}"
+def wait_until(condition, seconds=5):
+    deadline = time.monotonic() + seconds
+    while not condition():
+        assert time.monotonic() < deadline, "burst never arrived"
+        time.sleep(0.001)
+def run_burst(call):
+    results = [None] * BURST_CALLERS
+    def caller(n):
+        results[n] = call(f"prompt {n % BURST_KEYS}")
+    threads = [threading.Thread(target=caller, args=(n,)) for n in range(BURST_CALLERS)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, time.perf_counter() - start
+def check_burst():
+    group = Group()
+    gw = Gateway(max_concurrent=8, burst=BURST_CALLERS)
+    backend = StubBackend(lambda: wait_until(lambda: group.snapshot()["coalesced"] >= BURST_CALLERS - BURST_KEYS))
+    results, shared = run_burst(lambda key: group.do(key, lambda publish_wait: gw.call(lambda: backend.generate(key), on_wait=publish_wait)))
+    assert all(r == f"answer to prompt {n % BURST_KEYS}" for n, r in enumerate(results))
+    assert backend.calls == BURST_KEYS, f"{backend.calls} upstream calls for {BURST_KEYS} distinct prompts"
+    assert group.snapshot()["in_flight"] == 0
+    direct_backend = StubBackend()
+    direct_gw = Gateway(max_concurrent=8, burst=BURST_CALLERS)
+    _, direct = run_burst(lambda key: direct_gw.call(lambda: direct_backend.generate(key)))
+    print(f"burst: {BURST_CALLERS} callers, {BURST_KEYS} prompts")
+    print(f"  single-flight  {backend.calls:>4} upstream calls  {shared * 1000:>8.1f} ms")
+    print(f"  direct         {direct_backend.calls:>4} upstream calls  {direct * 1000:>8.1f} ms")
+def check_errors():
+    group = Group()
+    def fail(publish_wait):
+        time.sleep(SERVICE_SECONDS)
+        raise ValueError("backend said no")
+    errors = []
+    def caller(fn):
+        try:
+            group.do("key", fn)
+        except Exception as e:
+            errors.append(type(e))
+    for fn, expected in [(fail, ValueError), (lambda publish_wait: sys.exit(1), RuntimeError)]:
+        errors.clear()
+        threads = [threading.Thread(target=caller, args=(fn,)) for _ in range(10)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert errors == [expected] * 10, f"waiters saw {errors}"
+    print("errors: Exception shared with every waiter, SystemExit stays on the worker thread")
+def check_caller_callbacks():
+    # The first caller's on_wait raising (a Streamlit rerun) must not cancel the request the others share.
+    group = Group()
+    gw = Gateway(max_concurrent=1)
+    backend = StubBackend()
+    shared = lambda publish_wait: gw.call(lambda: backend.generate("key"), on_wait=publish_wait)
+    gw.acquire()
+    def interrupt(position, wait):
+        raise KeyboardInterrupt
+    try:
+        group.do("key", shared, on_wait=interrupt)
+        raise AssertionError("first caller's callback did not run")
+    except KeyboardInterrupt:
+        pass
+    positions = []
+    result = []
+    follower = threading.Thread(target=lambda: result.append(group.do("key", shared, on_wait=lambda p, w: positions.append(p))))
+    follower.start()
+    wait_until(lambda: positions)
+    gw.release()
+    follower.join()
+    assert result == ["answer to key"] and backend.calls == 1, f"{result}, {backend.calls} upstream calls"
+    print(f"callbacks: follower saw queue position {positions[0]} and the result after the first caller left")
+def main():
+    check_burst()
+    check_errors()
+    check_caller_callbacks()
+if __name__ == "__main__":
+    main()
@@ -1,47 +1,78 @@
 import streamlit as st
-import os
-import json
 import pandas as pd
+from utils.result_store import has_results, load_summary, read_results_page
+from utils.tracing import traced
+PAGE_SIZE = 20
+def average(stats):
+    return stats["score_sum"] / stats["count"] if stats["count"] else 0
+def is_instructor(user):
+    return user in st.secrets.get("INSTRUCTORS", [])
+@traced("dashboard.cohort")
+def show_cohort():
+    # pyarrow is only needed by instructors, so it is not loaded with the page.
+    from utils.analytics import run_query
+    st.subheader("🏫 Cohort Analytics")
+    with st.spinner("📦 Updating analytics..."):
+        topics = run_query("topic_difficulty")
+        scores = run_query("score_distribution", refresh_first=False)
+        activity = run_query("daily_activity", refresh_first=False)
+    if topics is None:
+        st.info("No quiz results recorded yet.")
+        return
+    st.markdown("### 🎯 Accuracy by Topic and Difficulty")
+    st.bar_chart(topics.pivot(index="topic", columns="difficulty", values="accuracy"))
+    st.markdown("### 📊 Score Distribution")
+    st.bar_chart(scores.set_index("range")["quizzes"])
+    st.markdown("### 📅 Daily Activity")
+    st.line_chart(activity.set_index("day")[["quizzes", "active_users"]])
 def show():
     st.title("📊 Dashboard")
     user = st.session_state["user"]
     st.write(f"**Logged in as:** `{user}`")
-    quiz_file = f"data/quizzes/{user}.json"
-    if not os.path.exists(quiz_file):
+    if is_instructor(user):
+        show_cohort()
+    if not has_results(user):
         st.warning("No quiz history found.")
         return
-    with open(quiz_file, "r") as f:
-        data = json.load(f)
-    if not data:
+    summary = load_summary(user)
+    total = summary["count"]
+    if not total:
         st.info("No quizzes taken yet.")
         return
-    df = pd.DataFrame(data)
+    st.subheader("📅 Quiz History")
+    pages = (total + PAGE_SIZE - 1) // PAGE_SIZE
+    page = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1) if pages > 1 else 1
+    df = pd.DataFrame.from_records(read_results_page(user, page - 1, PAGE_SIZE))
     df['timestamp'] = pd.to_datetime(df['timestamp'])
     df['Date'] = df['timestamp'].dt.date
     df['Time'] = df['timestamp'].dt.strftime("%H:%M:%S")
     columns_order = ['Date', 'Time', 'topic', 'difficulty', 'score']
     df = df[columns_order]
-    df = df.sort_values(["Date", "Time"], ascending=False)
-    st.subheader("📅 Quiz History")
-    df.index = range(len(df), 0, -1)
+    first = total - (page - 1) * PAGE_SIZE
+    df.index = range(first, first - len(df), -1)
     st.dataframe(df, use_container_width=True)
     st.subheader("📈 Overall Summary")
-    total = len(df)
-    avg_score = df["score"].mean()
-    best = df["score"].max()
-    col1, col2, col3 = st.columns(3)
+    recent = summary["recent_scores"]
+    col1, col2, col3, col4 = st.columns(4)
     col1.metric("Total Quizzes", total)
-    col2.metric("Average Score", f"{avg_score:.2f}")
-    col3.metric("Best Score", best)
+    col2.metric("Average Score", f"{average(summary):.2f}")
+    col3.metric("Best Score", summary["best"])
+    col4.metric(f"Last {len(recent)} Average", f"{sum(recent) / len(recent):.2f}")
     st.subheader("🧠 Performance by Difficulty")
     difficulties = ['Easy', 'Medium', 'Hard']
     for diff in difficulties:
-        diff_df = df[df['difficulty'].str.lower() == diff.lower()]
+        stats = summary["by_difficulty"].get(diff.lower())
         st.markdown(f"### 🎯 {diff} Level")
-        if diff_df.empty:
+        if not stats:
             st.info("No quizzes attempted at this level.")
         else:
             col1, col2, col3 = st.columns(3)
-            col1.metric("Quizzes Attempted", len(diff_df))
-            col2.metric("Average Score", f"{diff_df['score'].mean():.2f}")
-            col3.metric("Best Score", diff_df['score'].max())
\ No newline at end of file
+            col1.metric("Quizzes Attempted", stats["count"])
+            col2.metric("Average Score", f"{average(stats):.2f}")
+            col3.metric("Best Score", stats["best"])
+    st.subheader("📚 Performance by Topic")
+    topics = pd.DataFrame.from_records([
+        {"topic": topic, "quizzes": stats["count"], "average": round(average(stats), 2), "best": stats["best"]}
+        for topic, stats in summary["by_topic"].items()
+    ]).sort_values("quizzes", ascending=False)
+    st.dataframe(topics, use_container_width=True, hide_index=True)
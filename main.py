@@ -2,7 +2,8 @@ import streamlit as st
 from streamlit_cookies_manager import EncryptedCookieManager
 from dotenv import load_dotenv
 from auth import register_user, login_user
-import quiz, askme, resources, dashboard
+from utils.startup import PAGES, DEFAULT_PAGE, load_page, warm_up_in_background
+from utils.tracing import span
 import os
 import warnings
 warnings.filterwarnings("ignore", category=DeprecationWarning)
@@ -20,7 +21,7 @@ if not cookies.ready():
 if "user" not in st.session_state:
     st.session_state["user"] = cookies.get("user_email") 
 if "current_page" not in st.session_state:
-    st.session_state["current_page"] = "📊 Dashboard"
+    st.session_state["current_page"] = DEFAULT_PAGE
 if st.session_state["user"] is None:
     st.title("🔐 Welcome to Smart Teach AI")
     action = st.sidebar.radio("Choose Action", ["Login", "Register"])
@@ -32,7 +33,7 @@ if st.session_state["user"] is None:
                 st.session_state["user"] = email
                 cookies["user_email"] =  email
                 cookies.save()
-                st.session_state["current_page"] = "📊 Dashboard"
+                st.session_state["current_page"] = DEFAULT_PAGE
                 st.rerun()
             else:
                 st.error("Invalid credentials.")
@@ -46,27 +47,18 @@ if st.session_state["user"] is None:
             else:
                 st.error("User already exists.")
 else:
+    warm_up_in_background()
     name = st.session_state['user'].split('@')[0]
     st.sidebar.title(f"👋 Hello, {name}")
-    menu = st.sidebar.radio("Navigate", [
-        "📊 Dashboard",
-        "📝 Quiz Generator",
-        "💬 Ask Me",
-        "🔍 Resource Finder"
-    ])
+    menu = st.sidebar.radio("Navigate", list(PAGES))
     if st.sidebar.button("🚪 Logout"):
         del cookies["user_email"]
         cookies.save()
         st.session_state["user"] = None
-        st.session_state["current_page"] = "📊 Dashboard"
+        st.session_state["current_page"] = DEFAULT_PAGE
         st.rerun()
     if menu:
         st.session_state["current_page"] = menu
-    if st.session_state["current_page"] == "📝 Quiz Generator":
-        quiz.show()
-    elif st.session_state["current_page"] == "💬 Ask Me":
-        askme.show()
-    elif st.session_state["current_page"] == "🔍 Resource Finder":
-        resources.show()
-    else:
-        dashboard.show()
\ No newline at end of file
+    page = load_page(st.session_state["current_page"])
+    with span(f"page.{page.__name__}"):
+        page.show()
\ No newline at end of file
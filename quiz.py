@@ -1,24 +1,23 @@
 import streamlit as st
-import os, re
 from datetime import datetime
 from utils.pdf_utils import extract_text_from_pdf
-from utils.ibm_api import call_ibm_model
-from utils.file_utils import load_json, save_json
+from utils.ibm_api import stream_ibm_model, queue_status
+from utils.quiz_parser import QuestionStream
+from utils.quiz_generator import build_quiz_prompt, plan_batches, generate_questions, question_key, TOKENS_PER_QUESTION, QUIZ_TEMPERATURE
+from utils import question_bank
+from utils.tracing import traced
+from utils.result_store import append_result
 def save_quiz_result(user, score, total, topic, difficulty):
     if not user:
         st.error("User not logged in. Cannot save results.")
         return
-    path = f"data/quizzes/{user}.json"
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    history = load_json(path) if os.path.exists(path) else []
-    history.append({
+    append_result(user, {
         "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M"),
         "topic": topic,
         "difficulty": difficulty,
         "total_questions": total,
         "score": score
     })
-    save_json(path, history)
 def show():
     if "quiz" not in st.session_state:
         quiz_setup()
@@ -47,40 +46,86 @@ def quiz_setup():
             st.warning("Please upload a PDF or enter a topic.")
             return
         content = extract_text_from_pdf(uploaded_file) if uploaded_file else topic
-        prompt = f"""
-        You are an AI that generates multiple choice questions. Please generate {num_questions} MCQs based on the following topic. Each question should include 4 options and specify the correct answer. Use this exact format:
-
-        Q1. What is the capital of France?
-        A) Berlin
-        B) Madrid
-        C) Paris
-        D) Rome
-        Answer: C
-
-        Topic: {content}
-        Difficulty: {difficulty}
-                """
-        with st.spinner("⏳ Generating quiz..."):
-            result = call_ibm_model(prompt)
-        if not result:
-            st.error("❌ Model failed to respond.")
-            return
-        questions = parse_questions(result)
-        if not questions:
-            st.error("❌ Could not parse questions.")
-            return
-        st.session_state.quiz = {
-            "questions": questions[:num_questions],
-            "answers": [None] * num_questions,
-            "current_q": 0,
-            "topic": topic or "From PDF",
-            "difficulty": difficulty,
-            "quiz_started": False,
-            "quiz_submitted": False,
-            "score": 0,
-            "confirm_submit": False
-        }
+        # Typed topics share one bank entry across students; uploads are keyed by the document's hash.
+        bank_topic = "" if uploaded_file else question_bank.topic_key(topic)
+        source = question_bank.source_hash(content) if uploaded_file else ""
+        questions = question_bank.draw(user, bank_topic, difficulty, source, num_questions)
+        missing = num_questions - len(questions)
+        rejected = 0
+        if missing:
+            result = generate_missing(user, content, difficulty, missing, questions, num_questions)
+            if result is None:
+                return
+            generated, rejected = result
+            question_bank.add_questions(bank_topic, difficulty, source, generated, user=user)
+            seen = {question_key(q) for q in questions}
+            questions.extend(q for q in generated if question_key(q) not in seen)
+        question_bank.maybe_top_up(user, bank_topic, difficulty, source, content)
+        store_quiz(questions[:num_questions], topic, difficulty, rejected)
         st.rerun()
+@traced("quiz.generate")
+def generate_missing(user, content, difficulty, missing, drawn, num_questions):
+    if len(plan_batches(missing)) > 1:
+        progress = st.progress(0.0, text="⏳ Generating quiz...")
+        questions, rejected = generate_questions(
+            content, difficulty, missing, user=user,
+            on_progress=lambda done, total: progress.progress(done / total, text=f"⏳ Generated {done} / {total} questions...")
+        )
+        progress.empty()
+        if not questions and not drawn:
+            st.error(f"❌ Could not parse questions ({rejected} malformed).")
+            return None
+        return questions, rejected
+    prompt = build_quiz_prompt(content, difficulty, missing)
+    status = st.empty()
+    preview = st.empty()
+    received = 0
+    questions = []
+    question_stream = QuestionStream()
+    with st.spinner("⏳ Generating quiz..."):
+        max_tokens = missing * TOKENS_PER_QUESTION + TOKENS_PER_QUESTION
+        for chunk in stream_ibm_model(
+            prompt, max_tokens=max_tokens, temperature=QUIZ_TEMPERATURE, user=user, on_wait=queue_status(status), task="quiz",
+            use_cache=False, sample=True
+        ):
+            status.empty()
+            received += len(chunk)
+            new_questions = question_stream.feed(chunk)
+            if new_questions:
+                questions.extend(new_questions)
+                show_preview(preview, drawn + questions, num_questions)
+        questions.extend(question_stream.finish())
+    preview.empty()
+    rejected = len(question_stream.rejected)
+    if drawn:
+        return questions, rejected
+    if not received:
+        st.error("❌ Model failed to respond.")
+        return None
+    if not questions:
+        st.error(f"❌ Could not parse questions ({rejected} malformed).")
+        return None
+    return questions, rejected
+def store_quiz(questions, topic, difficulty, rejected=0):
+    st.session_state.quiz = {
+        "questions": questions,
+        "answers": [None] * len(questions),
+        "current_q": 0,
+        "topic": topic or "From PDF",
+        "difficulty": difficulty,
+        "rejected": rejected,
+        "quiz_started": False,
+        "quiz_submitted": False,
+        "score": 0,
+        "confirm_submit": False
+    }
+def show_preview(placeholder, questions, num_questions):
+    first = questions[0]
+    with placeholder.container():
+        st.info(f"✅ {len(questions)} / {num_questions} questions ready...")
+        st.markdown(f"**Q1: {first['question']}**")
+        for option in first["options"]:
+            st.markdown(f"- {option}")
 def quiz_metadata():
     st.markdown("""
     <style>
@@ -96,6 +141,8 @@ def quiz_metadata():
 **Difficulty:** `{quiz.get('difficulty', 'N/A')}`  
 **Questions:** `{len(quiz.get('questions', []))}`  
     """)
+    if quiz.get("rejected"):
+        st.caption(f"⚠️ Skipped {quiz['rejected']} malformed question(s) from the model.")
     st.markdown("---")
     if st.button("🚀 Start Quiz"):
         st.session_state["start_quiz_now"] = True
@@ -171,32 +218,5 @@ def show_result():
     if st.button("🏠 Return to Home"):
         del st.session_state.quiz
         st.rerun()
-def parse_questions(text):
-    try:
-        text = re.sub(r"\r", "", text)
-        text = re.sub(r"\n\s+", "\n", text)
-        pattern = re.compile(
-            r"Q\d+\.\s*(.*?)\nA\)\s*(.*?)\nB\)\s*(.*?)\nC\)\s*(.*?)\nD\)\s*(.*?)\nAnswer:\s*([A-Da-d])",
-            re.MULTILINE | re.DOTALL
-        )
-        matches = pattern.findall(text)
-        if not matches:
-            st.warning("⚠️ No matches found in model output.")
-            return None
-        questions = []
-        for m in matches:
-            q_text = m[0].strip()
-            options = [m[1].strip(), m[2].strip(), m[3].strip(), m[4].strip()]
-            correct = {"A": 0, "B": 1, "C": 2, "D": 3}.get(m[5].strip().upper(), None)
-            if correct is not None:
-                questions.append({
-                    "question": q_text,
-                    "options": options,
-                    "answer": options[correct]
-                })
-        return questions
-    except Exception as e:
-        st.error(f"Parser failed: {e}")
-        return None
 if __name__ == "__main__":
     show()
\ No newline at end of file
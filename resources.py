@@ -1,35 +1,73 @@
 import streamlit as st
-from utils.file_utils import save_json, load_json
+from utils import history_store, storage
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup, SoupStrainer
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from urllib.parse import urlparse, parse_qs
 from utils.ibm_api import call_ibm_model
 import os
+import threading
+import time
+from utils.tracing import span, traced
 HISTORY_DIR = "history_resources"
-os.makedirs(HISTORY_DIR, exist_ok=True)
+SEARCH_URL = os.getenv("SEARCH_URL", "https://duckduckgo.com/html/")
+SEARCH_TIMEOUT = (3.05, 10)
+SEARCH_CACHE_TTL = 3600
+SEARCH_CACHE_SIZE = 1024
+HISTORY_PAGE_SIZE = 5
+HISTORY_MAX_BYTES = 1024 * 1024
+HISTORY_KEEP = 200
+_session = requests.Session()
+_session.headers.update({"User-Agent": "Mozilla/5.0"})
+_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="resources")
+_search_cache = {}
+_search_lock = threading.Lock()
+def resolve_link(href):
+    # DuckDuckGo wraps results in a redirect that carries the target in "uddg".
+    target = parse_qs(urlparse(href or "").query).get("uddg")
+    return target[0] if target else href
+@traced("resources.web_search")
 def web_search(query, top_n=5):
+    key = (query.strip().lower(), top_n)
+    with _search_lock:
+        cached = _search_cache.get(key)
+    if cached and time.monotonic() - cached[0] < SEARCH_CACHE_TTL:
+        return cached[1]
     try:
-        headers = {"User-Agent": "Mozilla/5.0"}
-        resp = requests.get(f"https://duckduckgo.com/html/?q={query}", headers=headers)
+        resp = _session.get(SEARCH_URL, params={"q": query}, timeout=SEARCH_TIMEOUT)
         resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, "html.parser")
+        soup = BeautifulSoup(resp.text, "html.parser", parse_only=SoupStrainer("a", class_="result__a"))
         links = []
-        for a in soup.select("a.result__a")[:top_n]:
+        for a in soup.find_all("a", limit=top_n):
             links.append({
                 "title": a.get_text(strip=True),
-                "url": a.get("href")
+                "url": resolve_link(a.get("href"))
             })
-        return links
     except Exception as e:
         return []
+    if links:
+        with _search_lock:
+            if len(_search_cache) >= SEARCH_CACHE_SIZE:
+                _search_cache.clear()
+            _search_cache[key] = (time.monotonic(), links)
+    return links
 def get_history_path(user):
-    return os.path.join(HISTORY_DIR, f"{user}_resources.json")
-def load_history(user):
+    return storage.user_path(HISTORY_DIR, user, "_resources.jsonl")
+def load_history(user, count=HISTORY_PAGE_SIZE):
     path = get_history_path(user)
-    return load_json(path) if os.path.exists(path) else []
-def save_history(user, history):
-    path = get_history_path(user)
-    save_json(path, history)
+    history_store.migrate_legacy(storage.user_path(HISTORY_DIR, user, "_resources.json"), path)
+    return history_store.read_tail(path, count)
+def append_history(user, entry):
+    history_store.append_record(get_history_path(user), entry, max_bytes=HISTORY_MAX_BYTES, keep=HISTORY_KEEP)
+def show_links(links):
+    if not links:
+        st.markdown("_No web results._")
+    for link in links:
+        st.markdown(f"- [{link['title']}]({link['url']})")
 def show():
     st.title("🔍 Resource Finder")
     if "user" not in st.session_state:
@@ -42,27 +80,35 @@ def show():
         if not topic.strip():
             st.warning("⚠️ Please enter a valid topic.")
             return
-        with st.spinner("🔄 Searching..."):
+        with st.spinner("🔄 Searching..."), span("resources.search"):
+            ai_prompt = f"List 5 high-quality online resources to learn about: {topic}."
+            ai_future = _executor.submit(call_ibm_model, ai_prompt, max_tokens=200, temperature=0.2, user=user, task="resources")
+            links_future = _executor.submit(web_search, f"{topic} tutorial")
             try:
-                ai_prompt = f"List 5 high-quality online resources to learn about: {topic}."
-                ai_response = call_ibm_model(ai_prompt, max_tokens=200, temperature=0.2)
+                ai_response = ai_future.result()
             except Exception as e:
                 ai_response = ""
                 st.error(f"AI Error: {e}")
-            links = web_search(f"{topic} tutorial")
+            links = links_future.result()
         st.subheader("🧠 AI Suggestions")
         st.markdown(ai_response if ai_response else "_No AI response._")
+        st.subheader("🌐 Web Results")
+        show_links(links)
         entry = {
             "topic": topic,
             "time": datetime.now().strftime("%Y-%m-%d %H:%M"),
             "ai_response": ai_response.strip(),
+            "links": links,
         }
-        history.append(entry)
-        save_history(user, history)
+        append_history(user, entry)
+        history = (history + [entry])[-HISTORY_PAGE_SIZE:]
     if history:
         st.markdown("---")
         st.subheader("🕒 Your Past Searches")
-        for entry in reversed(history[-5:]):
+        for entry in reversed(history):
             with st.expander(f"{entry['topic']} ({entry['time']})"):
                 st.markdown("**🧠 AI Suggestion:**")
-                st.markdown(entry.get("ai_response", "_No AI response saved._"))
\ No newline at end of file
+                st.markdown(entry.get("ai_response", "_No AI response saved._"))
+                if entry.get("links"):
+                    st.markdown("**🌐 Web Results:**")
+                    show_links(entry["links"])
\ No newline at end of file
@@ -0,0 +1,163 @@
+import json
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from utils import result_store, storage
+from utils.tracing import traced
+ANALYTICS_DIR = "data/analytics"
+MAX_PARTS = 64
+MAX_WORKERS = os.cpu_count() or 2
+LOCK_STALE_SECONDS = 600
+SCORE_BINS = 10
+SCHEMA = pa.schema([
+    ("user", pa.string()),
+    ("day", pa.string()),
+    ("topic", pa.string()),
+    ("difficulty", pa.string()),
+    ("score", pa.int64()),
+    ("total_questions", pa.int64()),
+])
+_lock = threading.Lock()
+_query_cache = {}
+_process_pool = None
+def _parts_dir():
+    return os.path.join(ANALYTICS_DIR, "parts")
+def _manifest_path():
+    return os.path.join(ANALYTICS_DIR, "manifest.json")
+def load_manifest():
+    if not os.path.exists(_manifest_path()):
+        return {"version": 0, "next_part": 0, "offsets": {}}
+    with open(_manifest_path(), "r", encoding="utf-8") as f:
+        return json.load(f)
+def _save_manifest(manifest):
+    storage.write_json(_manifest_path(), manifest)
+def _acquire_refresh_lock():
+    path = os.path.join(ANALYTICS_DIR, "refresh.lock")
+    try:
+        os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        return path
+    except FileExistsError:
+        if time.time() - os.path.getmtime(path) > LOCK_STALE_SECONDS:
+            os.remove(path)
+            return _acquire_refresh_lock()
+        return None
+def _read_new_rows(path, user, offset, columns):
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    # Only complete lines are ingested; a line still being written is picked up next time.
+    end = data.rfind(b"\n") + 1
+    for line in data[:end].split(b"\n"):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        columns["user"].append(user)
+        columns["day"].append(str(record.get("timestamp", ""))[:10])
+        columns["topic"].append(str(record.get("topic", "")))
+        columns["difficulty"].append(str(record.get("difficulty", "")).lower())
+        columns["score"].append(int(record.get("score", 0)))
+        columns["total_questions"].append(int(record.get("total_questions", 0)))
+    return offset + end
+def refresh():
+    os.makedirs(_parts_dir(), exist_ok=True)
+    lock_path = _acquire_refresh_lock()
+    if lock_path is None:
+        return load_manifest()
+    try:
+        manifest = load_manifest()
+        offsets = manifest["offsets"]
+        columns = {name: [] for name in SCHEMA.names}
+        for entry in storage.iter_user_files(result_store.QUIZ_DIR, ".jsonl"):
+            size = entry.stat().st_size
+            offset = offsets.get(entry.name, 0)
+            if size < offset:
+                # The log was compacted; its records are already ingested up to the old size.
+                offsets[entry.name] = size
+            elif size > offset:
+                offsets[entry.name] = _read_new_rows(entry.path, entry.name[:-len(".jsonl")], offset, columns)
+        if columns["user"]:
+            part = os.path.join(_parts_dir(), f"part-{manifest['next_part']:06d}.parquet")
+            pq.write_table(pa.table(columns, schema=SCHEMA), part)
+            manifest["next_part"] += 1
+            manifest["version"] += 1
+        _save_manifest(manifest)
+        if len(part_paths()) > MAX_PARTS:
+            compact_parts(manifest)
+        return manifest
+    finally:
+        os.remove(lock_path)
+def part_paths():
+    if not os.path.isdir(_parts_dir()):
+        return []
+    return sorted(e.path for e in os.scandir(_parts_dir()) if e.name.endswith(".parquet"))
+def compact_parts(manifest):
+    paths = part_paths()
+    merged = os.path.join(_parts_dir(), f"part-{manifest['next_part']:06d}.parquet")
+    pq.write_table(pa.concat_tables(pq.read_table(path, schema=SCHEMA) for path in paths), merged)
+    manifest["next_part"] += 1
+    _save_manifest(manifest)
+    for path in paths:
+        os.remove(path)
+def _partial(query, path):
+    table = pq.read_table(path, schema=SCHEMA)
+    if query == "topic_difficulty":
+        return table.group_by(["topic", "difficulty"]).aggregate([
+            ("score", "sum"), ("score", "count"), ("total_questions", "sum")
+        ])
+    if query == "score_distribution":
+        ratio = pc.divide(pc.cast(table["score"], pa.float64()), pc.max_element_wise(table["total_questions"], 1))
+        bins = pc.min_element_wise(pc.cast(pc.floor(pc.multiply(ratio, SCORE_BINS)), pa.int64()), SCORE_BINS - 1)
+        return pa.table({"bin": bins}).group_by("bin").aggregate([("bin", "count")])
+    if query == "daily_activity":
+        return table.group_by(["day", "user"]).aggregate([("score", "count")])
+    raise ValueError(f"Unknown analytics query: {query}")
+def _merge(query, partials):
+    table = pa.concat_tables(partials)
+    if query == "topic_difficulty":
+        merged = table.group_by(["topic", "difficulty"]).aggregate([
+            ("score_sum", "sum"), ("score_count", "sum"), ("total_questions_sum", "sum")
+        ]).to_pandas()
+        merged.columns = ["topic", "difficulty", "score_sum", "quizzes", "questions"]
+        merged["accuracy"] = merged["score_sum"] / merged["questions"].clip(lower=1)
+        return merged.sort_values(["topic", "difficulty"]).reset_index(drop=True)
+    if query == "score_distribution":
+        merged = table.group_by("bin").aggregate([("bin_count", "sum")]).to_pandas()
+        merged.columns = ["bin", "quizzes"]
+        merged["range"] = merged["bin"].map(lambda b: f"{b * 100 // SCORE_BINS}-{(b + 1) * 100 // SCORE_BINS}%")
+        return merged.sort_values("bin").reset_index(drop=True)
+    per_user = table.group_by(["day", "user"]).aggregate([("score_count", "sum")])
+    merged = per_user.group_by("day").aggregate([("score_count_sum", "sum"), ("user", "count")]).to_pandas()
+    merged.columns = ["day", "quizzes", "active_users"]
+    return merged.sort_values("day").reset_index(drop=True)
+def _get_process_pool():
+    global _process_pool
+    if _process_pool is None:
+        # Spawned, not forked: the app process has many threads and a forked child may inherit a held lock.
+        _process_pool = ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _process_pool
+@traced("analytics.query")
+def run_query(query, refresh_first=True):
+    manifest = refresh() if refresh_first else load_manifest()
+    key = (query, manifest["version"])
+    with _lock:
+        if key in _query_cache:
+            return _query_cache[key]
+        pool = _get_process_pool()
+    paths = part_paths()
+    if not paths:
+        return None
+    partials = list(pool.map(_partial, [query] * len(paths), paths))
+    result = _merge(query, partials)
+    with _lock:
+        if len(_query_cache) > 32:
+            _query_cache.clear()
+        _query_cache[key] = result
+    return result
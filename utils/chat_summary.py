@@ -0,0 +1,51 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils import storage
+from utils.file_utils import chat_summary_path
+from utils.gateway import PRIORITY_BATCH
+from utils.ibm_api import call_ibm_model
+from utils.token_budget import count_tokens
+SUMMARY_TRIGGER_TOKENS = 1500
+RECENT_MESSAGES = 6
+SUMMARY_MAX_TOKENS = 300
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="chat-summary")
+_lock = threading.Lock()
+_pending = set()
+def load_summary(user_email, chat_id):
+    data = storage.read_json(chat_summary_path(user_email, chat_id))
+    if data is None:
+        return "", 0
+    return data["summary"], data["covered"]
+def _save_summary(user_email, chat_id, summary, covered):
+    storage.write_json(chat_summary_path(user_email, chat_id), {"summary": summary, "covered": covered})
+def build_summary_prompt(summary, messages):
+    transcript = "\n".join(f"{m['role'].capitalize()}: {m['content']}" for m in messages)
+    earlier = f"Summary so far:\n{summary}\n\n" if summary else ""
+    return (
+        "Update the summary of this study conversation. Keep the facts, definitions, decisions and open "
+        f"questions a tutor needs to continue it, in under 200 words.\n\n{earlier}New messages:\n{transcript}\n\nUpdated summary:"
+    )
+def _summarize(user_email, chat_id, messages, covered):
+    try:
+        summary, _ = load_summary(user_email, chat_id)
+        updated = call_ibm_model(
+            build_summary_prompt(summary, messages), max_tokens=SUMMARY_MAX_TOKENS, temperature=0.2,
+            user=user_email, priority=PRIORITY_BATCH, task="summary"
+        ).strip()
+        if updated and not updated.startswith("⚠️"):
+            _save_summary(user_email, chat_id, updated, covered)
+    finally:
+        with _lock:
+            _pending.discard((user_email, chat_id))
+def maybe_summarize(user_email, chat_id, history):
+    _, covered = load_summary(user_email, chat_id)
+    cutoff = len(history) - RECENT_MESSAGES
+    older = history[covered:cutoff]
+    if not older or sum(count_tokens(m["content"]) for m in older) < SUMMARY_TRIGGER_TOKENS:
+        return
+    key = (user_email, chat_id)
+    with _lock:
+        if key in _pending:
+            return
+        _pending.add(key)
+    _executor.submit(_summarize, user_email, chat_id, older, cutoff)
@@ -1,41 +1,79 @@
-import json
+import bisect
 import os
 import re
+from utils import history_store, storage
+from utils.tracing import traced
+CHAT_DIR = "data/chats"
 def load_json(filepath):
-    if not os.path.exists(filepath):
-        return []
-    with open(filepath, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return storage.read_json(filepath, [])
 def save_json(filepath, data):
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
+    storage.write_json(filepath, data)
 def sanitize_filename(name):
     name = re.sub(r'[\\/*?:"<>|]', '', name)
     return name.strip().replace(" ", "_")
-def save_chat(user_email, chat_id, messages):
-    user_dir = f"data/chats/{sanitize_filename(user_email)}"
-    os.makedirs(user_dir, exist_ok=True)
-    file_path = os.path.join(user_dir, f"{sanitize_filename(chat_id)}.json")
-    with open(file_path, "w", encoding="utf-8") as f:
-        json.dump(messages, f, indent=2, ensure_ascii=False)
+def chat_dir(user_email):
+    return storage.user_path(CHAT_DIR, sanitize_filename(user_email))
+def chat_path(user_email, chat_id):
+    return os.path.join(chat_dir(user_email), f"{sanitize_filename(chat_id)}.jsonl")
+def legacy_chat_path(user_email, chat_id):
+    return os.path.join(chat_dir(user_email), f"{sanitize_filename(chat_id)}.json")
+def chat_summary_path(user_email, chat_id):
+    return os.path.join(chat_dir(user_email), f"{sanitize_filename(chat_id)}.summary.json")
+def chat_index_path(user_email):
+    # Kept beside the user's chat directory so no chat id can collide with it.
+    return storage.user_path(CHAT_DIR, sanitize_filename(user_email), ".index.json")
+def _scan_chats(user_dir):
+    if not os.path.isdir(user_dir):
+        return []
+    return sorted({
+        os.path.splitext(f)[0] for f in os.listdir(user_dir)
+        if f.endswith((".json", ".jsonl")) and not f.endswith(".summary.json")
+    })
+def _load_index(user_email):
+    # {"chats": sorted chat ids, "suffixes": next "_n" to hand out per base name, 0 being the bare name}.
+    # Built once from the directory for old data.
+    index = storage.read_json(chat_index_path(user_email))
+    if index is None:
+        index = {"chats": _scan_chats(chat_dir(user_email)), "suffixes": {}}
+    return index
+def _add_to_index(index, chat_id):
+    position = bisect.bisect_left(index["chats"], chat_id)
+    if position == len(index["chats"]) or index["chats"][position] != chat_id:
+        index["chats"].insert(position, chat_id)
+def register_chat(user_email, chat_id):
+    path = chat_index_path(user_email)
+    with storage.locked(path):
+        index = _load_index(user_email)
+        _add_to_index(index, sanitize_filename(chat_id))
+        storage.write_json(path, index)
+@traced("chat.append")
+def append_chat(user_email, chat_id, messages):
+    path = chat_path(user_email, chat_id)
+    history_store.migrate_legacy(legacy_chat_path(user_email, chat_id), path)
+    if not os.path.exists(path):
+        register_chat(user_email, chat_id)
+    history_store.append_records(path, messages)
+@traced("chat.load")
 def load_chat(user_email, chat_id):
-    file_path = f"data/chats/{sanitize_filename(user_email)}/{sanitize_filename(chat_id)}.json"
-    if os.path.exists(file_path):
-        with open(file_path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return []
+    path = chat_path(user_email, chat_id)
+    history_store.migrate_legacy(legacy_chat_path(user_email, chat_id), path)
+    return list(history_store.iter_records(path))
 def list_chats(user_email):
-    user_dir = f"data/chats/{sanitize_filename(user_email)}"
-    if not os.path.exists(user_dir):
-        return []
-    return sorted([f.replace(".json", "") for f in os.listdir(user_dir) if f.endswith(".json")])
+    return _load_index(user_email)["chats"]
 def get_unique_chat_id(user_email, base_name):
-    user_dir = f"data/chats/{sanitize_filename(user_email)}"
-    os.makedirs(user_dir, exist_ok=True)
+    # Reserves the id by advancing its base name's counter under the index lock, so two tabs naming a chat at
+    # once get different ids. The chat is only listed once append_chat writes its first turn.
     base_name = sanitize_filename(base_name)
-    chat_id = base_name
-    i = 1
-    while os.path.exists(os.path.join(user_dir, f"{chat_id}.json")):
-        chat_id = f"{base_name}_{i}"
-        i += 1
-    return chat_id
\ No newline at end of file
+    path = chat_index_path(user_email)
+    with storage.locked(path):
+        index = _load_index(user_email)
+        chats = set(index["chats"])
+        n = index["suffixes"].get(base_name, 0)
+        while True:
+            chat_id = f"{base_name}_{n}" if n else base_name
+            n += 1
+            if chat_id not in chats:
+                break
+        index["suffixes"][base_name] = n
+        storage.write_json(path, index)
+    return chat_id
@@ -0,0 +1,137 @@
+import heapq
+import itertools
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from utils.tracing import traced
+MAX_CONCURRENT = 8
+USER_RATE_PER_SECOND = 1.0
+USER_BURST = 30
+MAX_RETRIES = 4
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 8.0
+WAIT_POLL_SECONDS = 0.5
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 5
+PRIORITY_BATCH = 10
+RETRYABLE_STATUS = re.compile(r"\b(429|5\d\d)\b")
+def status_code(exc):
+    response = getattr(exc, "response", None)
+    code = getattr(response, "status_code", None) or getattr(exc, "status_code", None)
+    if code is None:
+        match = RETRYABLE_STATUS.search(str(exc))
+        code = int(match.group(1)) if match else None
+    return code
+def is_retryable(exc):
+    code = status_code(exc)
+    return code is not None and (code == 429 or 500 <= code < 600)
+def backoff_delay(attempt):
+    # Full jitter keeps a burst of failed callers from retrying in lockstep.
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+    def reserve(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return max(0.0, -self.tokens / self.rate)
+class Gateway:
+    def __init__(self, max_concurrent=MAX_CONCURRENT, rate=USER_RATE_PER_SECOND, burst=USER_BURST):
+        self.max_concurrent = max_concurrent
+        self.rate = rate
+        self.burst = burst
+        self._cond = threading.Condition()
+        self._queue = []
+        self._seq = itertools.count()
+        self._active = 0
+        self._buckets = {}
+        self._service_seconds = 2.0
+        self.stats = {"admitted": 0, "rate_limited": 0, "retries": 0, "failures": 0}
+    def _rate_limit(self, user, on_wait):
+        with self._cond:
+            bucket = self._buckets.setdefault(user, TokenBucket(self.rate, self.burst))
+            delay = bucket.reserve(time.monotonic())
+            if delay:
+                self.stats["rate_limited"] += 1
+        deadline = time.monotonic() + delay
+        while delay > 0:
+            if on_wait:
+                on_wait(0, delay)
+            time.sleep(min(delay, WAIT_POLL_SECONDS))
+            delay = deadline - time.monotonic()
+    def _position(self, entry):
+        return sum(1 for other in self._queue if other < entry)
+    def estimated_wait(self, position):
+        return (position // self.max_concurrent + 1) * self._service_seconds if position else 0.0
+    def _admit(self, entry):
+        if self._queue[0] != entry or self._active >= self.max_concurrent:
+            return False
+        heapq.heappop(self._queue)
+        self._active += 1
+        self.stats["admitted"] += 1
+        self._cond.notify_all()
+        return True
+    @traced("gateway.wait")
+    def acquire(self, user=None, priority=PRIORITY_NORMAL, on_wait=None):
+        self._rate_limit(user, on_wait)
+        entry = (priority, next(self._seq))
+        with self._cond:
+            heapq.heappush(self._queue, entry)
+        try:
+            while True:
+                with self._cond:
+                    if self._admit(entry):
+                        return
+                    position = self._position(entry) + 1
+                # The callback may render UI or raise (a rerun, Ctrl-C); it never runs while other callers wait on the lock.
+                if on_wait:
+                    on_wait(position, self.estimated_wait(position))
+                with self._cond:
+                    if self._admit(entry):
+                        return
+                    self._cond.wait(WAIT_POLL_SECONDS)
+        except BaseException:
+            # An abandoned entry at the head of the heap would block every later caller.
+            with self._cond:
+                if entry in self._queue:
+                    self._queue.remove(entry)
+                    heapq.heapify(self._queue)
+                    self._cond.notify_all()
+            raise
+    def release(self, elapsed=None):
+        with self._cond:
+            self._active -= 1
+            if elapsed is not None:
+                self._service_seconds = 0.8 * self._service_seconds + 0.2 * elapsed
+            self._cond.notify_all()
+    @contextmanager
+    def slot(self, user=None, priority=PRIORITY_NORMAL, on_wait=None):
+        self.acquire(user, priority, on_wait)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - start)
+    def call(self, fn, user=None, priority=PRIORITY_NORMAL, on_wait=None):
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                with self.slot(user, priority, on_wait):
+                    return fn()
+            except Exception as e:
+                if attempt == MAX_RETRIES or not is_retryable(e):
+                    with self._cond:
+                        self.stats["failures"] += 1
+                    raise
+                with self._cond:
+                    self.stats["retries"] += 1
+            time.sleep(backoff_delay(attempt))
+    def snapshot(self):
+        with self._cond:
+            return dict(self.stats, active=self._active, queued=len(self._queue), service_seconds=self._service_seconds)
+gateway = Gateway()
@@ -0,0 +1,87 @@
+import json
+import os
+from collections import deque
+from itertools import islice
+from utils import storage
+READ_BLOCK_BYTES = 64 * 1024
+def write_records(path, records):
+    storage.atomic_write(path, "".join(storage.dumps(record) + "\n" for record in records))
+def migrate_legacy(legacy_path, path):
+    if os.path.exists(legacy_path) and not os.path.exists(path):
+        with storage.locked(path):
+            if os.path.exists(legacy_path) and not os.path.exists(path):
+                write_records(path, storage.read_json(legacy_path, []))
+                os.replace(legacy_path, f"{legacy_path}.migrated")
+def append_records(path, records, max_bytes=None, keep=None, compact_torn=False):
+    data = "".join(storage.dumps(record) + "\n" for record in records).encode("utf-8")
+    torn = False
+    # Appends and compactions share one lock so a rewrite never drops a record appended while it ran.
+    with storage.locked(path):
+        with open(path, "ab+") as f:
+            # A crash mid-append leaves a torn last line; start on a fresh line so only that record is lost.
+            if f.seek(0, os.SEEK_END):
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    data = b"\n" + data
+                    torn = True
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+            size = f.tell()
+        if (max_bytes is not None and size > max_bytes) or (torn and compact_torn):
+            _compact(path, keep)
+def append_record(path, record, max_bytes=None, keep=None, compact_torn=False):
+    append_records(path, [record], max_bytes, keep, compact_torn)
+def iter_records(path):
+    if not os.path.exists(path):
+        return
+    torn = 0
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                torn += 1
+    if torn:
+        compact(path)
+def iter_records_newest_first(path):
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        position = f.seek(0, os.SEEK_END)
+        tail = b""
+        while position > 0:
+            step = min(READ_BLOCK_BYTES, position)
+            position -= step
+            f.seek(position)
+            lines = (f.read(step) + tail).split(b"\n")
+            tail = lines.pop(0)
+            for line in reversed(lines):
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+        if tail.strip():
+            try:
+                yield json.loads(tail)
+            except json.JSONDecodeError:
+                pass
+def read_page(path, page, page_size):
+    return list(islice(iter_records_newest_first(path), page * page_size, (page + 1) * page_size))
+def read_tail(path, count):
+    return list(reversed(read_page(path, 0, count)))
+def _compact(path, keep=None):
+    records = deque(maxlen=keep)
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    write_records(path, records)
+def compact(path, keep=None):
+    with storage.locked(path):
+        _compact(path, keep)
@@ -1,30 +1,149 @@
+import threading
+import time
 import streamlit as st
-from ibm_watsonx_ai.foundation_models import Model
-from utils.model_selector import choose_best_model
-def call_ibm_model(prompt, max_tokens=500, temperature=0.3, top_p=0.9, top_k=50):
-    API_KEY = st.secrets["IBM_API_KEY"]
-    PROJECT_ID = st.secrets["IBM_PROJECT_ID"]
-    REGION_URL = st.secrets["IBM_URL"]
-    model_id = choose_best_model(prompt)
+from ibm_watsonx_ai import APIClient, Credentials
+from ibm_watsonx_ai.foundation_models import ModelInference
+from utils.model_selector import choose_best_model, explore, record_latency
+from utils.token_budget import count_tokens
+from utils import response_cache
+from utils.gateway import gateway, is_retryable, backoff_delay, MAX_RETRIES, PRIORITY_NORMAL
+from utils.singleflight import Group
+from utils.tracing import traced, traced_iter, register_stats
+# IAM tokens live for 60 minutes; rebuild the shared client a little before that.
+TOKEN_REFRESH_SECONDS = 50 * 60
+MODEL_IDLE_SECONDS = 15 * 60
+_lock = threading.Lock()
+_api_client = None
+_api_client_created = 0.0
+_models = {}
+inflight = Group()
+client_stats = {"hits": 0, "misses": 0, "handshakes": 0, "handshakes_avoided": 0, "evictions": 0}
+def _get_api_client(now):
+    global _api_client, _api_client_created
+    if _api_client is None or now - _api_client_created > TOKEN_REFRESH_SECONDS:
+        credentials = Credentials(url=st.secrets["IBM_URL"], api_key=st.secrets["IBM_API_KEY"])
+        _api_client = APIClient(credentials, project_id=st.secrets["IBM_PROJECT_ID"])
+        _api_client_created = now
+        _models.clear()
+        client_stats["handshakes"] += 1
+    else:
+        client_stats["handshakes_avoided"] += 1
+    return _api_client
+def _evict_idle(now):
+    for key, (_, last_used) in list(_models.items()):
+        if now - last_used > MODEL_IDLE_SECONDS:
+            del _models[key]
+            client_stats["evictions"] += 1
+@traced("model.get_model")
+def get_model(model_id, params):
+    key = (model_id, tuple(sorted(params.items())))
+    now = time.monotonic()
+    with _lock:
+        _evict_idle(now)
+        api_client = _get_api_client(now)
+        entry = _models.get(key)
+        if entry is not None:
+            client_stats["hits"] += 1
+            model = entry[0]
+        else:
+            client_stats["misses"] += 1
+            model = ModelInference(model_id=model_id, params=params, api_client=api_client)
+        _models[key] = (model, now)
+    return model
+def warm_up():
+    with _lock:
+        _get_api_client(time.monotonic())
+def get_client_stats():
+    with _lock:
+        return dict(client_stats, pooled_models=len(_models))
+register_stats("model_clients", get_client_stats)
+def queue_status(placeholder):
+    def on_wait(position, wait):
+        if position:
+            placeholder.info(f"⏳ Queue position {position}, about {wait:.0f}s to wait...")
+        else:
+            placeholder.info(f"⏳ Too many requests, continuing in {wait:.0f}s...")
+    return on_wait
+def _decoding_params(max_tokens, temperature, top_p, top_k, sample=False):
+    return {
+        "decoding_method": "sample" if sample else "greedy",
+        "max_new_tokens": max_tokens,
+        "temperature": temperature,
+        "top_p": top_p,
+        "top_k": top_k
+    }
+def _request_key(prompt, model_id, params):
+    return (model_id, response_cache.normalize_prompt(prompt), tuple(sorted(params.items())))
+@traced("model.generate")
+def _timed_generate(model, model_id, prompt):
+    start = time.monotonic()
+    response = model.generate(prompt)
+    result = response["results"][0]
+    record_latency(model_id, time.monotonic() - start, result.get("generated_token_count") or count_tokens(result["generated_text"]))
+    return response
+def _generate(model, prompt, model_id, served_id, params, user, priority, publish_wait):
+    response = gateway.call(lambda: _timed_generate(model, served_id, prompt), user, priority, publish_wait)
+    text = response["results"][0]["generated_text"]
+    response_cache.put(prompt, model_id, params, text)
+    return text
+@traced("model.call")
+def call_ibm_model(prompt, max_tokens=500, temperature=0.3, top_p=0.9, top_k=50, user=None, priority=PRIORITY_NORMAL, on_wait=None, task="chat", use_cache=True, sample=False):
+    model_id = choose_best_model(prompt, max_tokens, task)
     if not model_id:
         return "⚠️ Prompt is too long for all available models."
-    model = Model(
-        model_id=model_id,
-        params={
-            "decoding_method": "greedy",
-            "max_new_tokens": max_tokens,
-            "temperature": temperature,
-            "top_p": top_p,
-            "top_k": top_k
-        },
-        project_id=PROJECT_ID,
-        credentials={
-            "apikey": API_KEY,
-            "url": REGION_URL
-        }
-    )
+    params = _decoding_params(max_tokens, temperature, top_p, top_k, sample)
+    # use_cache=False skips the lookup for callers that need a fresh answer; the result is still stored.
+    cached = response_cache.get(prompt, model_id, params) if use_cache else None
+    if cached is not None:
+        return cached
+    # Cache and single-flight keys use the policy choice; only the model that serves the request may differ.
+    served_id = explore(model_id, prompt, max_tokens)
+    model = get_model(served_id, params)
     try:
-        response = model.generate(prompt)
-        return response["results"][0]["generated_text"]
+        return inflight.do(
+            _request_key(prompt, model_id, params),
+            lambda publish_wait: _generate(model, prompt, model_id, served_id, params, user, priority, publish_wait),
+            on_wait
+        )
     except Exception as e:
-        return f"⚠️ Error occurred: {str(e)}"
\ No newline at end of file
+        return f"⚠️ Error occurred: {str(e)}"
+def _stream_producer(model, prompt, model_id, served_id, params, user, priority):
+    def produce(on_wait):
+        chunks = []
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                with gateway.slot(user, priority, on_wait):
+                    start = time.monotonic()
+                    for chunk in traced_iter("model.stream", model.generate_text_stream(prompt)):
+                        if chunk:
+                            chunks.append(chunk)
+                            yield chunk
+                    record_latency(served_id, time.monotonic() - start, count_tokens("".join(chunks)))
+                response_cache.put(prompt, model_id, params, "".join(chunks))
+                return
+            except Exception as e:
+                # Once text has reached the readers a retry would duplicate it.
+                if chunks or attempt == MAX_RETRIES or not is_retryable(e):
+                    raise
+            time.sleep(backoff_delay(attempt))
+    return produce
+def stream_ibm_model(prompt, max_tokens=500, temperature=0.3, top_p=0.9, top_k=50, user=None, priority=PRIORITY_NORMAL, on_wait=None, task="chat", use_cache=True, sample=False):
+    model_id = choose_best_model(prompt, max_tokens, task)
+    if not model_id:
+        yield "⚠️ Prompt is too long for all available models."
+        return
+    params = _decoding_params(max_tokens, temperature, top_p, top_k, sample)
+    cached = response_cache.get(prompt, model_id, params) if use_cache else None
+    if cached is not None:
+        yield cached
+        return
+    served_id = explore(model_id, prompt, max_tokens)
+    model = get_model(served_id, params)
+    try:
+        yield from inflight.stream(
+            _request_key(prompt, model_id, params),
+            _stream_producer(model, prompt, model_id, served_id, params, user, priority),
+            on_wait
+        )
+    except Exception as e:
+        yield f"⚠️ Error occurred: {str(e)}"
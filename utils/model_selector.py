@@ -1,13 +1,57 @@
-def estimate_tokens(text):
-    return int(len(text.split()) * 1.3)
+import random
+import threading
+from utils.token_budget import count_tokens
 SUPPORTED_MODELS = [
-    {"id": "ibm/granite-3.3-2b-instruct","limit": 131072},
-    {"id": "ibm/granite-3.3-8b-instruct","limit": 131072},
-    {"id": "ibm/granite-3-8b-instruct","limit": 131072},
+    {"id": "ibm/granite-3.3-2b-instruct","limit": 131072, "quality": 0.6, "tokens_per_second": 60.0},
+    {"id": "ibm/granite-3.3-8b-instruct","limit": 131072, "quality": 0.9, "tokens_per_second": 30.0},
+    {"id": "ibm/granite-3-8b-instruct","limit": 131072, "quality": 0.8, "tokens_per_second": 30.0},
 ]
-def choose_best_model(prompt):
-    token_count = estimate_tokens(prompt)
-    for model in sorted(SUPPORTED_MODELS, key=lambda x: x["limit"]):
-        if token_count <= model["limit"]:
-            return model["id"]
-    return None
\ No newline at end of file
+MODELS_BY_LIMIT = sorted(SUPPORTED_MODELS, key=lambda x: x["limit"])
+# Score = quality weight * model quality - latency weight * expected seconds.
+POLICIES = {
+    "latency": {"quality": 1.0, "latency": 2.0},
+    "balanced": {"quality": 5.0, "latency": 0.1},
+    "quality": {"quality": 10.0, "latency": 0.05},
+}
+TASK_POLICIES = {"title": "latency", "chat": "balanced", "quiz": "quality", "resources": "balanced", "summary": "latency"}
+EXPECTED_OUTPUT_TOKENS = {"title": 20, "chat": 400, "resources": 200, "summary": 300}
+PREFILL_SPEEDUP = 20
+EXPLORATION_RATE = 0.05
+EWMA_ALPHA = 0.2
+_lock = threading.Lock()
+_observed = {m["id"]: {"tokens_per_second": m["tokens_per_second"], "latency": None, "calls": 0} for m in SUPPORTED_MODELS}
+def expected_latency(model_id, prompt_tokens, output_tokens):
+    with _lock:
+        rate = _observed[model_id]["tokens_per_second"]
+    return prompt_tokens / (rate * PREFILL_SPEEDUP) + output_tokens / rate
+def choose_best_model(prompt, max_tokens=0, task="chat"):
+    token_count = count_tokens(prompt)
+    fitting = [m for m in MODELS_BY_LIMIT if token_count + max_tokens <= m["limit"]]
+    if not fitting:
+        return None
+    weights = POLICIES[TASK_POLICIES.get(task, "balanced")]
+    output_tokens = min(max_tokens, EXPECTED_OUTPUT_TOKENS.get(task, max_tokens))
+    return max(
+        fitting,
+        key=lambda m: weights["quality"] * m["quality"] - weights["latency"] * expected_latency(m["id"], token_count, output_tokens)
+    )["id"]
+def explore(model_id, prompt, max_tokens=0):
+    # A small share of upstream requests goes to a model the policy is not currently picking, to keep its
+    # measurements fresh. Callers key caches on the policy choice, so this never splits identical prompts.
+    if random.random() >= EXPLORATION_RATE:
+        return model_id
+    token_count = count_tokens(prompt)
+    return random.choice([m for m in MODELS_BY_LIMIT if token_count + max_tokens <= m["limit"]])["id"]
+def record_latency(model_id, elapsed, output_tokens):
+    if model_id not in _observed or elapsed <= 0:
+        return
+    with _lock:
+        stats = _observed[model_id]
+        stats["calls"] += 1
+        stats["latency"] = elapsed if stats["latency"] is None else (1 - EWMA_ALPHA) * stats["latency"] + EWMA_ALPHA * elapsed
+        if output_tokens:
+            rate = output_tokens / elapsed
+            stats["tokens_per_second"] = (1 - EWMA_ALPHA) * stats["tokens_per_second"] + EWMA_ALPHA * rate
+def get_model_stats():
+    with _lock:
+        return {model_id: dict(stats) for model_id, stats in _observed.items()}
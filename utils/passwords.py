@@ -0,0 +1,66 @@
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+SCRYPT_N = int(os.getenv("SCRYPT_N", 2 ** 14))
+SCRYPT_R = int(os.getenv("SCRYPT_R", 8))
+SCRYPT_P = int(os.getenv("SCRYPT_P", 1))
+SALT_BYTES = 16
+KEY_BYTES = 32
+KDF_WORKERS = int(os.getenv("KDF_WORKERS", 4))
+VERIFY_CACHE_SIZE = 4096
+# Caps concurrent KDF runs so a burst of sign-ins queues instead of exhausting CPU and memory.
+_pool = ThreadPoolExecutor(max_workers=KDF_WORKERS, thread_name_prefix="kdf")
+_cache_key = os.urandom(32)
+_lock = threading.Lock()
+_verified = OrderedDict()
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r, dklen=KEY_BYTES)
+def _hash(password, n, r, p):
+    salt = os.urandom(SALT_BYTES)
+    return f"scrypt${n}${r}${p}${salt.hex()}${_scrypt(password, salt, n, r, p).hex()}"
+def hash_password(password, n=None, r=None, p=None):
+    return _pool.submit(_hash, password, n or SCRYPT_N, r or SCRYPT_R, p or SCRYPT_P).result()
+def is_legacy_hash(stored):
+    return len(stored) == 64 and not stored.startswith("scrypt$")
+def _check(password, stored):
+    if is_legacy_hash(stored):
+        return hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), stored), True
+    _, n, r, p, salt, expected = stored.split("$")
+    n, r, p = int(n), int(r), int(p)
+    ok = hmac.compare_digest(_scrypt(password, bytes.fromhex(salt), n, r, p).hex(), expected)
+    return ok, (n, r, p) < (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+def verify_password(password, stored):
+    cache_key = hmac.new(_cache_key, f"{stored}\0{password}".encode(), hashlib.sha256).digest()
+    with _lock:
+        if cache_key in _verified:
+            _verified.move_to_end(cache_key)
+            return True, _verified[cache_key]
+    ok, needs_upgrade = _pool.submit(_check, password, stored).result()
+    if ok:
+        with _lock:
+            _verified[cache_key] = needs_upgrade
+            while len(_verified) > VERIFY_CACHE_SIZE:
+                _verified.popitem(last=False)
+    return ok, needs_upgrade
+def calibrate(target_ms=250, r=SCRYPT_R, p=SCRYPT_P, max_n=2 ** 20):
+    n = best = 2 ** 12
+    timings = []
+    while n <= max_n:
+        start = time.perf_counter()
+        _scrypt("calibration", os.urandom(SALT_BYTES), n, r, p)
+        elapsed = (time.perf_counter() - start) * 1000
+        timings.append((n, elapsed))
+        if elapsed > target_ms:
+            break
+        best = n
+        n *= 2
+    return best, timings
+if __name__ == "__main__":
+    n, timings = calibrate()
+    for cost, elapsed in timings:
+        print(f"n=2**{cost.bit_length() - 1:<3} {elapsed:8.1f} ms")
+    print(f"SCRYPT_N={n}")
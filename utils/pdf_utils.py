@@ -1,7 +1,156 @@
-import fitz 
-def extract_text_from_pdf(pdf_file):
-    text = ""
-    with fitz.open(stream=pdf_file.read(), filetype="pdf") as doc:
-        for page in doc:
-            text += page.get_text()
-    return text
\ No newline at end of file
+import hashlib
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+import fitz
+from PIL import Image
+import pytesseract
+from utils import storage
+from utils.token_budget import count_tokens
+from utils.tracing import traced, register_stats
+CACHE_DIR = "data/extract_cache"
+MEMORY_CACHE_BYTES = 64 * 1024 * 1024
+DISK_CACHE_BYTES = 1024 * 1024 * 1024
+PAGES_PER_TASK = 8
+PARALLEL_MIN_PAGES = 16
+MAX_WORKERS = os.cpu_count() or 2
+OCR_DPI = 200
+_process_pool = None
+_lock = threading.Lock()
+_memory_cache = OrderedDict()
+_memory_bytes = 0
+cache_stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "memory_evictions": 0, "disk_evictions": 0}
+def read_upload(file):
+    return file.getvalue() if hasattr(file, "getvalue") else file.read()
+def file_digest(data):
+    return hashlib.sha256(data).hexdigest()
+def _remember(key, text):
+    global _memory_bytes
+    size = len(text.encode("utf-8"))
+    if size > MEMORY_CACHE_BYTES:
+        return
+    if key in _memory_cache:
+        _memory_bytes -= len(_memory_cache.pop(key).encode("utf-8"))
+    _memory_cache[key] = text
+    _memory_bytes += size
+    while _memory_bytes > MEMORY_CACHE_BYTES:
+        _, evicted = _memory_cache.popitem(last=False)
+        _memory_bytes -= len(evicted.encode("utf-8"))
+        cache_stats["memory_evictions"] += 1
+def _disk_path(key):
+    return os.path.join(CACHE_DIR, f"{key}.txt")
+def _evict_disk():
+    entries = [e for e in os.scandir(CACHE_DIR) if e.name.endswith(".txt")]
+    total = sum(e.stat().st_size for e in entries)
+    for entry in sorted(entries, key=lambda e: e.stat().st_mtime):
+        if total <= DISK_CACHE_BYTES:
+            break
+        total -= entry.stat().st_size
+        os.remove(entry.path)
+        cache_stats["disk_evictions"] += 1
+def _cache_get(key):
+    with _lock:
+        if key in _memory_cache:
+            _memory_cache.move_to_end(key)
+            cache_stats["memory_hits"] += 1
+            return _memory_cache[key]
+    path = _disk_path(key)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    os.utime(path)
+    with _lock:
+        cache_stats["disk_hits"] += 1
+        _remember(key, text)
+    return text
+def _cache_put(key, text):
+    storage.atomic_write(_disk_path(key), text)
+    with _lock:
+        _remember(key, text)
+        _evict_disk()
+def cached_extract(data, kind, extract):
+    key = f"{kind}-{file_digest(data)}"
+    text = _cache_get(key)
+    if text is not None:
+        return text
+    with _lock:
+        cache_stats["misses"] += 1
+    text = extract(data)
+    _cache_put(key, text)
+    return text
+def get_cache_stats():
+    with _lock:
+        lookups = cache_stats["memory_hits"] + cache_stats["disk_hits"] + cache_stats["misses"]
+        hits = lookups - cache_stats["misses"]
+        return dict(cache_stats, memory_bytes=_memory_bytes, hit_rate=hits / lookups if lookups else 0.0)
+register_stats("extraction_cache", get_cache_stats)
+def _get_process_pool():
+    global _process_pool
+    with _lock:
+        if _process_pool is None:
+            # Forking the threaded server could hand a worker a lock some other thread was holding; spawn starts clean.
+            _process_pool = ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _process_pool
+def _page_text(page):
+    text = page.get_text()
+    if not text.strip() and page.get_images():
+        pixmap = page.get_pixmap(dpi=OCR_DPI)
+        text = pytesseract.image_to_string(Image.open(io.BytesIO(pixmap.tobytes("png"))))
+    return text
+def _extract_page_range(path, start, stop):
+    with fitz.open(path) as doc:
+        return [_page_text(doc[i]) for i in range(start, stop)]
+def iter_pdf_pages(data):
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        if doc.page_count < PARALLEL_MIN_PAGES:
+            for page in doc:
+                yield _page_text(page)
+            return
+        page_count = doc.page_count
+    # Workers open the document from a temp file instead of receiving the bytes per task.
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+        f.write(data)
+        path = f.name
+    pool = _get_process_pool()
+    ranges = deque((start, min(start + PAGES_PER_TASK, page_count)) for start in range(0, page_count, PAGES_PER_TASK))
+    pending = deque()
+    try:
+        while ranges or pending:
+            while ranges and len(pending) < MAX_WORKERS * 2:
+                pending.append(pool.submit(_extract_page_range, path, *ranges.popleft()))
+            yield from pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+        for future in pending:
+            if not future.cancelled():
+                future.exception()
+        os.remove(path)
+def _pdf_text(data, max_tokens=None):
+    pages = []
+    tokens = 0
+    for text in iter_pdf_pages(data):
+        pages.append(text)
+        tokens += count_tokens(text)
+        if max_tokens is not None and tokens >= max_tokens:
+            break
+    return "".join(pages)
+def _image_text(data):
+    return pytesseract.image_to_string(Image.open(io.BytesIO(data)))
+@traced("pdf.extract")
+def extract_text_from_pdf(pdf_file, max_tokens=None):
+    data = read_upload(pdf_file)
+    if max_tokens is None:
+        return cached_extract(data, "pdf", _pdf_text)
+    full_text = _cache_get(f"pdf-{file_digest(data)}")
+    if full_text is not None:
+        return full_text
+    return cached_extract(data, f"pdf{max_tokens}t", lambda d: _pdf_text(d, max_tokens))
+@traced("image.extract")
+def extract_text_from_image(image_file):
+    return cached_extract(read_upload(image_file), "ocr", _image_text)
@@ -0,0 +1,45 @@
+from collections import deque
+import numpy as np
+from utils.token_budget import count_tokens, plan_budget, prefix_costs
+from utils.tracing import traced
+def trim_to_tokens(text, max_tokens):
+    if count_tokens(text) <= max_tokens:
+        return text
+    words = text.split()
+    keep = int(np.searchsorted(prefix_costs(words), max_tokens, side="left"))
+    return " ".join(words[:keep])
+@traced("prompt.build")
+def build_prompt(history, user_input, context, max_total_tokens, max_output_tokens, summary=""):
+    prompt_parts = []
+    budget = plan_budget(max_total_tokens, max_output_tokens, user_input)
+    available_tokens = budget.context + budget.history
+
+    if context:
+        context = trim_to_tokens(context, budget.context)
+        prompt_parts.append(context)
+        available_tokens -= count_tokens(context)
+
+    if summary:
+        summary = trim_to_tokens(f"Summary of the earlier conversation: {summary}", max(available_tokens, 0))
+        available_tokens -= count_tokens(summary)
+
+    trimmed_history = deque()
+    for msg in reversed(history):
+        if msg["role"] in ("user", "assistant"):
+            content = msg["content"]
+            tokens = count_tokens(content)
+            if tokens <= available_tokens:
+                trimmed_history.appendleft(content)
+                available_tokens -= tokens
+            else:
+                break
+    if summary:
+        prompt_parts.append(summary)
+    prompt_parts.extend(trimmed_history)
+
+    user_input = user_input.strip()
+    if not user_input.endswith("."):
+        user_input += "."
+    prompt_parts.append(user_input)
+
+    return "\n\n".join(prompt_parts)
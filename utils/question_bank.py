@@ -0,0 +1,122 @@
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from utils import storage
+from utils.quiz_generator import generate_questions, question_key
+from utils.tracing import traced, register_stats
+BANK_DB = "data/question_bank.db"
+LOW_STOCK = 20
+TOP_UP_QUESTIONS = 40
+# Distinct students served from a bank entry before it is topped up in the background.
+TOP_UP_MIN_USERS = 3
+_lock = threading.Lock()
+_pending = set()
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="question-bank")
+bank_stats = {"drawn": 0, "added": 0, "top_ups": 0, "rejected": 0}
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS questions (id INTEGER PRIMARY KEY, topic TEXT NOT NULL, difficulty TEXT NOT NULL, "
+    "source TEXT NOT NULL, fingerprint TEXT NOT NULL, question TEXT NOT NULL, created REAL NOT NULL, "
+    "UNIQUE (topic, difficulty, source, fingerprint))",
+    "CREATE INDEX IF NOT EXISTS questions_topic ON questions (topic, difficulty, source)",
+    "CREATE TABLE IF NOT EXISTS served (user TEXT NOT NULL, question_id INTEGER NOT NULL, PRIMARY KEY (user, question_id))",
+    "CREATE INDEX IF NOT EXISTS served_question ON served (question_id)",
+)
+def _connection():
+    return storage.sqlite_connection(BANK_DB, SCHEMA)
+def topic_key(topic):
+    return " ".join((topic or "").lower().split())
+def source_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+def fingerprint(question):
+    return hashlib.sha1(question_key(question).encode("utf-8")).hexdigest()
+def _mark_served(conn, user, ids):
+    conn.executemany("INSERT OR IGNORE INTO served (user, question_id) VALUES (?, ?)", [(user, i) for i in ids])
+@traced("question_bank.draw")
+def draw(user, topic, difficulty, source, count):
+    # Random sample of questions this user has not been served yet; marks them served in the same transaction.
+    conn = _connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        rows = conn.execute(
+            "SELECT id, question FROM questions WHERE topic = ? AND difficulty = ? AND source = ? "
+            "AND id NOT IN (SELECT question_id FROM served WHERE user = ?) ORDER BY random() LIMIT ?",
+            (topic, difficulty, source, user, count)
+        ).fetchall()
+        _mark_served(conn, user, [row[0] for row in rows])
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    with _lock:
+        bank_stats["drawn"] += len(rows)
+    return [json.loads(row[1]) for row in rows]
+def add_questions(topic, difficulty, source, questions, user=None):
+    conn = _connection()
+    now = time.time()
+    rows = [(topic, difficulty, source, fingerprint(q), json.dumps(q, ensure_ascii=False), now) for q in questions]
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        before = conn.total_changes
+        conn.executemany(
+            "INSERT OR IGNORE INTO questions (topic, difficulty, source, fingerprint, question, created) VALUES (?, ?, ?, ?, ?, ?)",
+            rows
+        )
+        added = conn.total_changes - before
+        if user:
+            ids = [
+                conn.execute(
+                    "SELECT id FROM questions WHERE topic = ? AND difficulty = ? AND source = ? AND fingerprint = ?",
+                    (topic, difficulty, source, row[3])
+                ).fetchone()[0]
+                for row in rows
+            ]
+            _mark_served(conn, user, ids)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    with _lock:
+        bank_stats["added"] += added
+    return added
+def unseen_stock(user, topic, difficulty, source):
+    return _connection().execute(
+        "SELECT COUNT(*) FROM questions WHERE topic = ? AND difficulty = ? AND source = ? "
+        "AND id NOT IN (SELECT question_id FROM served WHERE user = ?)",
+        (topic, difficulty, source, user)
+    ).fetchone()[0]
+def demand(topic, difficulty, source, limit=TOP_UP_MIN_USERS):
+    # Distinct users served from this bank entry, counted only up to limit.
+    return _connection().execute(
+        "SELECT COUNT(*) FROM (SELECT DISTINCT served.user FROM questions JOIN served ON served.question_id = questions.id "
+        "WHERE questions.topic = ? AND questions.difficulty = ? AND questions.source = ? LIMIT ?)",
+        (topic, difficulty, source, limit)
+    ).fetchone()[0]
+def _top_up(topic, difficulty, source, content):
+    try:
+        questions, rejected = generate_questions(content, difficulty, TOP_UP_QUESTIONS)
+        add_questions(topic, difficulty, source, questions)
+        with _lock:
+            bank_stats["top_ups"] += 1
+            bank_stats["rejected"] += rejected
+    finally:
+        with _lock:
+            _pending.discard((topic, difficulty, source))
+def maybe_top_up(user, topic, difficulty, source, content):
+    # Only entries several students have used are worth generating ahead for; a one-off topic never is.
+    if unseen_stock(user, topic, difficulty, source) >= LOW_STOCK or demand(topic, difficulty, source) < TOP_UP_MIN_USERS:
+        return False
+    key = (topic, difficulty, source)
+    with _lock:
+        if key in _pending:
+            return False
+        _pending.add(key)
+    _executor.submit(_top_up, topic, difficulty, source, content)
+    return True
+def get_bank_stats():
+    with _lock:
+        stats = dict(bank_stats)
+    stats["questions"] = _connection().execute("SELECT COUNT(*) FROM questions").fetchone()[0]
+    return stats
+register_stats("question_bank", get_bank_stats)
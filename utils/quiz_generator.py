@@ -0,0 +1,81 @@
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from utils.ibm_api import call_ibm_model
+from utils.gateway import PRIORITY_BATCH
+from utils.quiz_parser import parse_quiz
+TOKENS_PER_QUESTION = 90
+BATCH_MAX_TOKENS = 1800
+MAX_WORKERS = 4
+MAX_RETRIES = 2
+# Questions come from the bank first, so generation is only asked for questions it does not hold yet: sample
+# for variety and skip the response cache, whose answers the bank already has. Identical concurrent requests
+# still share one call through single-flight.
+QUIZ_TEMPERATURE = 0.7
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="quiz-batch")
+def build_quiz_prompt(content, difficulty, num_questions, part=1, parts=1):
+    spread = f"\n        This is part {part} of {parts}; cover different subtopics than the other parts." if parts > 1 else ""
+    return f"""
+        You are an AI that generates multiple choice questions. Please generate {num_questions} MCQs based on the following topic. Each question should include 4 options and specify the correct answer. Use this exact format:
+
+        Q1. What is the capital of France?
+        A) Berlin
+        B) Madrid
+        C) Paris
+        D) Rome
+        Answer: C
+{spread}
+        Topic: {content}
+        Difficulty: {difficulty}
+                """
+def batch_size(max_tokens=BATCH_MAX_TOKENS):
+    return max(1, max_tokens // TOKENS_PER_QUESTION)
+def plan_batches(num_questions, max_tokens=BATCH_MAX_TOKENS):
+    size = batch_size(max_tokens)
+    full, rest = divmod(num_questions, size)
+    return [size] * full + ([rest] if rest else [])
+def question_key(question):
+    return re.sub(r"[^a-z0-9]+", " ", question["question"].lower()).strip()
+def _run_batch(generate, user, content, difficulty, size, part, parts):
+    prompt = build_quiz_prompt(content, difficulty, size, part, parts)
+    max_tokens = size * TOKENS_PER_QUESTION + TOKENS_PER_QUESTION
+    questions, rejected = parse_quiz(generate(
+        prompt, max_tokens=max_tokens, temperature=QUIZ_TEMPERATURE, user=user, priority=PRIORITY_BATCH, task="quiz",
+        use_cache=False, sample=True
+    ))
+    return questions, len(rejected)
+def generate_questions(content, difficulty, num_questions, user=None, generate=call_ibm_model, on_progress=None):
+    # Returns the questions and how many malformed blocks were dropped along the way, like parse_quiz.
+    questions = []
+    rejected = 0
+    seen = set()
+    pending = plan_batches(num_questions)
+    for _ in range(MAX_RETRIES + 1):
+        if not pending:
+            break
+        parts = len(pending)
+        futures = {
+            _executor.submit(_run_batch, generate, user, content, difficulty, size, part, parts): size
+            for part, size in enumerate(pending, start=1)
+        }
+        short = []
+        for future in as_completed(futures):
+            size = futures[future]
+            try:
+                batch, batch_rejected = future.result()
+            except Exception:
+                batch, batch_rejected = [], 0
+            rejected += batch_rejected
+            added = 0
+            for question in batch:
+                key = question_key(question)
+                if key not in seen:
+                    seen.add(key)
+                    questions.append(question)
+                    added += 1
+            if added < size:
+                short.append(size - added)
+            if on_progress:
+                on_progress(min(len(questions), num_questions), num_questions)
+        # Only the shortfall is retried, re-planned into token-sized batches.
+        pending = plan_batches(sum(short)) if short else []
+    return questions[:num_questions], rejected
@@ -0,0 +1,107 @@
+import re
+# One pass over complete lines. A line opens a question ("Q1.", "1.", "Question 1:"), adds an option
+# ("A)", "b.", "(c)"), closes the block with "Answer:", or continues the text of the last field.
+LINE_PATTERN = re.compile(
+    r"[\s*#]*(?:"
+    r"(?P<answer>(?:correct\s+)?answer)\s*[:\-]"
+    r"|(?:(?P<prefix>q(?:uestion)?)\s*)?(?P<number>\d+)\s*[.):]"
+    r"|\(?(?P<option>[a-d])\s*[).:]"
+    r")[\s*]*",
+    re.IGNORECASE
+)
+OPTION_LETTERS = "ABCD"
+ANSWER_INDEX = {"A": 0, "B": 1, "C": 2, "D": 3}
+# A leading letter standing on its own: "C", "(C)", "C) Paris", "C - Paris", "C, Paris", "C is correct".
+ANSWER_LETTER = re.compile(r"\(?([a-d])\b", re.IGNORECASE)
+def clean(text):
+    return " ".join(text.split()).strip("* ")
+class QuestionStream:
+    def __init__(self):
+        self.buffer = ""
+        self.rejected = []
+        self._block = None
+    def _open(self, line, text):
+        self._block = {"lines": [line], "question": [text], "options": [], "error": None}
+    def _reject(self, reason):
+        block = self._block
+        self.rejected.append({"reason": block["error"] or reason, "text": "\n".join(block["lines"])})
+        self._block = None
+    def _close(self, text):
+        block = self._block
+        self._block = None
+        options = [clean(" ".join(parts)) for parts in block["options"]]
+        question = clean(" ".join(block["question"]))
+        if block["error"] or len(options) != 4 or not question or not all(options):
+            reason = block["error"] or ("expected 4 options" if len(options) != 4 else "empty question or option")
+            self.rejected.append({"reason": reason, "text": "\n".join(block["lines"])})
+            return None
+        # Some outputs spell the answer out ("Answer: Paris"); the option text is tried first so an answer
+        # like "a mitochondrion" is not read as option A.
+        text = clean(text)
+        matches = [i for i, option in enumerate(options) if option.lower() == text.lower()]
+        letter = ANSWER_LETTER.match(text)
+        if len(matches) == 1:
+            correct = matches[0]
+        elif letter:
+            correct = ANSWER_INDEX[letter.group(1).upper()]
+        else:
+            self.rejected.append({"reason": "unrecognized answer", "text": "\n".join(block["lines"])})
+            return None
+        return {"question": question, "options": options, "answer": options[correct]}
+    def _line(self, line):
+        match = LINE_PATTERN.match(line)
+        kind = match and match.lastgroup
+        if kind == "answer":
+            if self._block is None:
+                if line.strip():
+                    self.rejected.append({"reason": "answer without question", "text": line})
+                return None
+            self._block["lines"].append(line)
+            return self._close(line[match.end():])
+        if kind == "number" and self._block is not None and not self._block["options"] and not match.group("prefix"):
+            # A stem may list numbered statements; before the options only "Q2." or "Question 2:" starts a new block.
+            kind = None
+        elif kind == "number":
+            if self._block is not None:
+                self._reject("missing answer")
+            self._open(line, line[match.end():])
+            return None
+        if self._block is None:
+            # Text between questions (intros, echoed instructions) is not part of any block.
+            return None
+        block = self._block
+        block["lines"].append(line)
+        if kind == "option":
+            letter = match.group("option").upper()
+            if OPTION_LETTERS.find(letter) != len(block["options"]):
+                block["error"] = block["error"] or f"option {letter} out of order"
+            block["options"].append([line[match.end():]])
+        elif block["options"]:
+            block["options"][-1].append(line)
+        else:
+            block["question"].append(line)
+        return None
+    def feed(self, chunk):
+        # Only complete lines are parsed; an answer letter is final once the line it sits on has ended.
+        self.buffer += chunk
+        end = self.buffer.rfind("\n")
+        if end < 0:
+            return []
+        lines = self.buffer[:end].replace("\r", "").split("\n")
+        self.buffer = self.buffer[end + 1:]
+        questions = []
+        for line in lines:
+            question = self._line(line)
+            if question:
+                questions.append(question)
+        return questions
+    def finish(self):
+        questions = self.feed("\n") if self.buffer else []
+        if self._block is not None:
+            self._reject("missing answer")
+        return questions
+def parse_quiz(text):
+    stream = QuestionStream()
+    questions = stream.feed(text)
+    questions.extend(stream.finish())
+    return questions, stream.rejected
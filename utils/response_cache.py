@@ -0,0 +1,109 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from utils import storage
+from utils.token_budget import count_tokens
+from utils.tracing import traced, register_stats
+CACHE_DB = "data/response_cache.db"
+TTL_SECONDS = 7 * 24 * 3600
+MEMORY_ENTRIES = 512
+MAX_ROWS = 50000
+PRUNE_EVERY = 200
+CACHE_MAX_TEMPERATURE = 0.5
+NEAR_DUPLICATE_LOOKUP = False
+_lock = threading.Lock()
+_memory = OrderedDict()
+_puts = 0
+cache_stats = {"lookups": 0, "hits": 0, "near_hits": 0, "bypassed": 0, "tokens_saved": 0}
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, near_key TEXT NOT NULL, "
+    "response TEXT NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS responses_near_key ON responses (near_key)",
+    "CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)",
+)
+def _connection():
+    return storage.sqlite_connection(CACHE_DB, SCHEMA)
+def normalize_prompt(prompt):
+    return re.sub(r"\s+", " ", prompt).strip()
+def _near_form(prompt):
+    # Only case and spacing are folded; punctuation carries meaning ("C++" vs "C#", "2^3" vs "2*3").
+    return " ".join(prompt.lower().split())
+def _digest(text, model_id, params):
+    payload = json.dumps([text, model_id, sorted(params.items())], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+def is_cacheable(params):
+    return params.get("decoding_method") == "greedy" or params.get("temperature", 0) <= CACHE_MAX_TEMPERATURE
+def _remember(key, response, created):
+    _memory[key] = (response, created)
+    _memory.move_to_end(key)
+    while len(_memory) > MEMORY_ENTRIES:
+        _memory.popitem(last=False)
+def _record_hit(prompt, response, near=False):
+    with _lock:
+        cache_stats["hits"] += 1
+        cache_stats["near_hits"] += near
+        cache_stats["tokens_saved"] += count_tokens(prompt) + count_tokens(response)
+@traced("response_cache.get")
+def get(prompt, model_id, params):
+    with _lock:
+        cache_stats["lookups"] += 1
+        if not is_cacheable(params):
+            cache_stats["bypassed"] += 1
+            return None
+    key = _digest(normalize_prompt(prompt), model_id, params)
+    now = time.time()
+    with _lock:
+        entry = _memory.get(key)
+        if entry is not None and entry[1] > now - TTL_SECONDS:
+            _memory.move_to_end(key)
+        else:
+            entry = None
+    if entry is not None:
+        _record_hit(prompt, entry[0])
+        return entry[0]
+    conn = _connection()
+    row = conn.execute("SELECT response, created, key FROM responses WHERE key = ? AND created > ?", (key, now - TTL_SECONDS)).fetchone()
+    near = False
+    if row is None and NEAR_DUPLICATE_LOOKUP:
+        row = conn.execute(
+            "SELECT response, created, key FROM responses WHERE near_key = ? AND created > ? ORDER BY created DESC LIMIT 1",
+            (_digest(_near_form(prompt), model_id, params), now - TTL_SECONDS)
+        ).fetchone()
+        near = row is not None
+    if row is None:
+        return None
+    # Refresh the row that was actually served, which on a near hit is not the exact key.
+    conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, row[2]))
+    with _lock:
+        _remember(key, row[0], row[1])
+    _record_hit(prompt, row[0], near)
+    return row[0]
+def put(prompt, model_id, params, response):
+    global _puts
+    if not is_cacheable(params) or not response:
+        return
+    key = _digest(normalize_prompt(prompt), model_id, params)
+    now = time.time()
+    conn = _connection()
+    conn.execute(
+        "INSERT OR REPLACE INTO responses (key, near_key, response, created, last_used) VALUES (?, ?, ?, ?, ?)",
+        (key, _digest(_near_form(prompt), model_id, params), response, now, now)
+    )
+    with _lock:
+        _remember(key, response, now)
+        _puts += 1
+        prune = _puts % PRUNE_EVERY == 0
+    if prune:
+        conn.execute("DELETE FROM responses WHERE created <= ?", (now - TTL_SECONDS,))
+        conn.execute(
+            "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (MAX_ROWS,)
+        )
+def get_cache_stats():
+    with _lock:
+        lookups = cache_stats["lookups"]
+        return dict(cache_stats, hit_rate=cache_stats["hits"] / lookups if lookups else 0.0)
+register_stats("response_cache", get_cache_stats)
@@ -0,0 +1,60 @@
+import os
+from utils import history_store, storage
+from utils.tracing import traced
+QUIZ_DIR = "data/quizzes"
+RECENT_WINDOW = 10
+def results_path(user):
+    return storage.user_path(QUIZ_DIR, user, ".jsonl")
+def summary_path(user):
+    return storage.user_path(QUIZ_DIR, user, ".summary.json")
+def legacy_results_path(user):
+    return storage.user_path(QUIZ_DIR, user, ".json")
+def _migrate_legacy(user):
+    history_store.migrate_legacy(legacy_results_path(user), results_path(user))
+def has_results(user):
+    return os.path.exists(results_path(user)) or os.path.exists(legacy_results_path(user))
+def _empty_stats():
+    return {"count": 0, "score_sum": 0, "best": None}
+def _add_score(stats, score):
+    stats["count"] += 1
+    stats["score_sum"] += score
+    stats["best"] = score if stats["best"] is None else max(stats["best"], score)
+def apply_result(summary, record):
+    score = record.get("score", 0)
+    _add_score(summary, score)
+    _add_score(summary["by_difficulty"].setdefault(str(record.get("difficulty", "")).lower(), _empty_stats()), score)
+    _add_score(summary["by_topic"].setdefault(record.get("topic", ""), _empty_stats()), score)
+    summary["recent_scores"] = (summary["recent_scores"] + [score])[-RECENT_WINDOW:]
+def build_summary(records):
+    summary = dict(_empty_stats(), by_difficulty={}, by_topic={}, recent_scores=[])
+    for record in records:
+        apply_result(summary, record)
+    return summary
+def _save_summary(user, summary):
+    storage.write_json(summary_path(user), summary)
+def load_summary(user):
+    summary = storage.read_json(summary_path(user))
+    if summary is not None:
+        return summary
+    summary = build_summary(iter_results(user))
+    if summary["count"]:
+        _save_summary(user, summary)
+    return summary
+@traced("results.append")
+def append_result(user, record):
+    _migrate_legacy(user)
+    # The summary is read, updated and rewritten under its lock so concurrent quizzes are all counted.
+    with storage.locked(summary_path(user)):
+        summary = load_summary(user)
+        # Results are never trimmed (the dashboard pages through all of them), so the only garbage is a line torn
+        # by a crash. The append that finds one compacts the log right away instead of on a size cap.
+        history_store.append_record(results_path(user), record, compact_torn=True)
+        apply_result(summary, record)
+        _save_summary(user, summary)
+def iter_results(user):
+    _migrate_legacy(user)
+    return history_store.iter_records(results_path(user))
+@traced("results.page")
+def read_results_page(user, page, page_size):
+    _migrate_legacy(user)
+    return history_store.read_page(results_path(user), page, page_size)
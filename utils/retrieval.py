@@ -0,0 +1,79 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+import numpy as np
+from utils.tracing import traced
+CHUNK_WORDS = 200
+CHUNK_OVERLAP = 40
+TOP_K = 5
+MAX_INDEXES = 32
+BM25_K1 = 1.5
+BM25_B = 0.75
+TERM_PATTERN = re.compile(r"[a-z0-9]+")
+_lock = threading.Lock()
+_indexes = OrderedDict()
+index_stats = {"hits": 0, "builds": 0}
+def tokenize(text):
+    return TERM_PATTERN.findall(text.lower())
+def chunk_text(text):
+    words = text.split()
+    step = CHUNK_WORDS - CHUNK_OVERLAP
+    return [" ".join(words[i:i + CHUNK_WORDS]) for i in range(0, max(len(words) - CHUNK_OVERLAP, 1), step)]
+class DocumentIndex:
+    def __init__(self, text):
+        self.chunks = chunk_text(text)
+        self.vocab = {}
+        rows = []
+        cols = []
+        for i, chunk in enumerate(self.chunks):
+            for term in tokenize(chunk):
+                cols.append(self.vocab.setdefault(term, len(self.vocab)))
+                rows.append(i)
+        n = len(self.chunks)
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        # Postings are stored term-major: (term, chunk) pairs with their counts, one slice per term.
+        pairs, self.tf = np.unique(cols * n + rows, return_counts=True)
+        self.post_terms = pairs // n
+        self.post_chunks = pairs % n
+        self.term_start = np.searchsorted(self.post_terms, np.arange(len(self.vocab) + 1))
+        doc_freq = np.diff(self.term_start)
+        self.idf = np.log1p((n - doc_freq + 0.5) / (doc_freq + 0.5))
+        chunk_len = np.bincount(rows, minlength=n).astype(np.float64)
+        avg_len = chunk_len.mean() if n and chunk_len.any() else 1.0
+        self.norm = BM25_K1 * (1 - BM25_B + BM25_B * chunk_len / avg_len)
+    def search(self, query, top_k=TOP_K):
+        scores = np.zeros(len(self.chunks))
+        for term in set(tokenize(query)):
+            t = self.vocab.get(term)
+            if t is None:
+                continue
+            start, stop = self.term_start[t], self.term_start[t + 1]
+            chunks = self.post_chunks[start:stop]
+            tf = self.tf[start:stop]
+            scores[chunks] += self.idf[t] * tf * (BM25_K1 + 1) / (tf + self.norm[chunks])
+        top = np.argsort(-scores, kind="stable")[:top_k]
+        return sorted(int(i) for i in top if scores[i] > 0)
+def get_index(text):
+    key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    with _lock:
+        index = _indexes.get(key)
+        if index is not None:
+            _indexes.move_to_end(key)
+            index_stats["hits"] += 1
+            return index
+    index = DocumentIndex(text)
+    with _lock:
+        _indexes[key] = index
+        index_stats["builds"] += 1
+        while len(_indexes) > MAX_INDEXES:
+            _indexes.popitem(last=False)
+    return index
+@traced("retrieval.select")
+def select_context(text, question, top_k=TOP_K):
+    if len(text.split()) <= CHUNK_WORDS * top_k:
+        return text
+    index = get_index(text)
+    selected = index.search(question, top_k) or list(range(min(top_k, len(index.chunks))))
+    return "\n\n".join(index.chunks[i] for i in selected)
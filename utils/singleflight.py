@@ -0,0 +1,139 @@
+import threading
+import time
+WAIT_POLL_SECONDS = 0.5
+class _Call:
+    def __init__(self):
+        self.done = False
+        self.result = None
+        self.error = None
+        self.wait_state = None
+        self._cond = threading.Condition()
+    def publish_wait(self, position, wait):
+        with self._cond:
+            self.wait_state = (position, wait)
+            self._cond.notify_all()
+    def finish(self, result=None, error=None):
+        with self._cond:
+            self.result = result
+            self.error = error
+            self.done = True
+            self._cond.notify_all()
+    def wait(self, on_wait=None, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        reported = None
+        while True:
+            with self._cond:
+                while not self.done and (on_wait is None or self.wait_state is reported):
+                    remaining = WAIT_POLL_SECONDS if deadline is None else min(WAIT_POLL_SECONDS, deadline - time.monotonic())
+                    if remaining <= 0:
+                        raise TimeoutError("Timed out waiting for an identical in-flight request.")
+                    self._cond.wait(remaining)
+                wait_state = self.wait_state
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return self.result
+            # Each caller reports queue progress with its own callback, outside the lock.
+            reported = wait_state
+            on_wait(*wait_state)
+class SharedStream:
+    def __init__(self):
+        self.chunks = []
+        self.finished = False
+        self.error = None
+        self.wait_state = None
+        self._cond = threading.Condition()
+    def publish_wait(self, position, wait):
+        with self._cond:
+            self.wait_state = (position, wait)
+            self._cond.notify_all()
+    def append(self, chunk):
+        with self._cond:
+            self.chunks.append(chunk)
+            self.wait_state = None
+            self._cond.notify_all()
+    def finish(self, error=None):
+        with self._cond:
+            self.error = error
+            self.finished = True
+            self._cond.notify_all()
+    def iter(self, on_wait=None):
+        index = 0
+        reported = None
+        while True:
+            with self._cond:
+                while index >= len(self.chunks) and not self.finished and (on_wait is None or self.wait_state is reported):
+                    self._cond.wait(WAIT_POLL_SECONDS)
+                chunks = self.chunks[index:]
+                index += len(chunks)
+                finished = self.finished and index >= len(self.chunks)
+                wait_state = self.wait_state
+            # Callbacks and readers run outside the lock so a slow reader never stalls the producer.
+            if on_wait and not chunks and wait_state is not None and wait_state is not reported:
+                reported = wait_state
+                on_wait(*wait_state)
+            yield from chunks
+            if finished:
+                if self.error is not None:
+                    raise self.error
+                return
+class Group:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._streams = {}
+        self.stats = {"calls": 0, "streams": 0, "coalesced": 0}
+    def do(self, key, fn, on_wait=None, timeout=None):
+        # fn receives a callback for queue progress instead of any caller's on_wait, and runs on its own thread
+        # so a caller that gives up or is interrupted only stops waiting; the shared call keeps running for the others.
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.stats["calls"] += 1
+                threading.Thread(target=self._run_call, args=(key, call, fn), daemon=True).start()
+            else:
+                self.stats["coalesced"] += 1
+        return call.wait(on_wait, timeout)
+    def _run_call(self, key, call, fn):
+        result, error = None, None
+        try:
+            result = fn(call.publish_wait)
+        except Exception as e:
+            error = e
+        except BaseException:
+            # Interpreter-level exits are not the callers' to handle; they only learn the call did not finish.
+            error = RuntimeError("The shared request was interrupted.")
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.finish(result, error)
+    def stream(self, key, produce, on_wait=None):
+        with self._lock:
+            shared = self._streams.get(key)
+            if shared is None:
+                shared = self._streams[key] = SharedStream()
+                self.stats["streams"] += 1
+                threading.Thread(target=self._run_stream, args=(key, shared, produce), daemon=True).start()
+            else:
+                self.stats["coalesced"] += 1
+        return shared.iter(on_wait)
+    def _run_stream(self, key, shared, produce):
+        # The producer owns the upstream stream so a reader leaving early does not cut off the others.
+        error = None
+        try:
+            for chunk in produce(shared.publish_wait):
+                shared.append(chunk)
+        except Exception as e:
+            error = e
+        except BaseException:
+            error = RuntimeError("The shared request was interrupted.")
+            raise
+        finally:
+            with self._lock:
+                del self._streams[key]
+            shared.finish(error)
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, in_flight=len(self._calls) + len(self._streams))
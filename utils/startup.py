@@ -0,0 +1,65 @@
+import importlib
+import os
+import re
+import subprocess
+import sys
+import threading
+# Page label -> module. Each page module (and the SDKs it pulls in) is imported the first time it is opened.
+PAGES = {
+    "📊 Dashboard": "dashboard",
+    "📝 Quiz Generator": "quiz",
+    "💬 Ask Me": "askme",
+    "🔍 Resource Finder": "resources",
+}
+DEFAULT_PAGE = "📊 Dashboard"
+# What the login screen needs, followed by each page.
+PROFILE_MODULES = ["streamlit", "auth", *PAGES.values()]
+WARM_MODULES = ["utils.ibm_api", "quiz", "askme", "resources", "dashboard"]
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+_lock = threading.Lock()
+_warm_thread = None
+warm_errors = {}
+def load_page(label):
+    return importlib.import_module(PAGES.get(label, PAGES[DEFAULT_PAGE]))
+def _warm_up():
+    for name in WARM_MODULES:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            warm_errors[name] = e
+    try:
+        importlib.import_module("utils.ibm_api").warm_up()
+    except Exception as e:
+        # The first real request builds the client again and reports the failure to the user.
+        warm_errors["client"] = e
+def warm_up_in_background():
+    # Runs once per process; reruns and later sessions reuse the imported modules and the shared client.
+    global _warm_thread
+    with _lock:
+        if _warm_thread is None:
+            _warm_thread = threading.Thread(target=_warm_up, name="warm-up", daemon=True)
+            _warm_thread.start()
+    return _warm_thread
+def _import_times(code):
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, cwd=os.getcwd())
+    costs = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match and len(match.group(3)) == 1:
+            package = match.group(4).split(".")[0]
+            costs[package] = costs.get(package, 0) + int(match.group(2))
+    return result.returncode, costs
+def import_profile(module):
+    # Cumulative import cost per top-level package in a fresh interpreter, minus what the interpreter loads anyway.
+    _, baseline = _import_times("pass")
+    code, costs = _import_times(f"import {module}")
+    return code, {package: cost for package, cost in costs.items() if package not in baseline}
+def report(modules, top=8):
+    for module in modules:
+        code, costs = import_profile(module)
+        status = "" if code == 0 else "  (import failed)"
+        print(f"{module:<16} {sum(costs.values()) / 1000:9.1f} ms{status}")
+        for package, cost in sorted(costs.items(), key=lambda item: -item[1])[:top]:
+            print(f"    {package:<24} {cost / 1000:9.1f} ms")
+if __name__ == "__main__":
+    report(sys.argv[1:] or PROFILE_MODULES)
@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+# Per-user files live under <root>/<shard>/<name>, where the shard is the first SHARD_CHARS hex digits
+# of the name's SHA-1. With 256 shards a directory holds a few hundred entries even at 100k users.
+SHARD_CHARS = 2
+LOCK_RETRY_SECONDS = 0.05
+_migrate_lock = threading.Lock()
+_migrated = set()
+_sqlite_local = threading.local()
+def shard(name):
+    return hashlib.sha1(name.encode("utf-8")).hexdigest()[:SHARD_CHARS]
+def _migrate(legacy_path, path):
+    if path in _migrated:
+        return
+    with _migrate_lock:
+        if path in _migrated:
+            return
+        if os.path.exists(legacy_path) and not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Another process may have moved it already.
+            try:
+                os.replace(legacy_path, path)
+            except FileNotFoundError:
+                pass
+        _migrated.add(path)
+def user_path(root, name, suffix=""):
+    # Files and directories from the old flat layout (<root>/<name><suffix>) are moved into their shard on first use.
+    path = os.path.join(root, shard(name), f"{name}{suffix}")
+    _migrate(os.path.join(root, f"{name}{suffix}"), path)
+    return path
+def iter_user_files(root, suffix):
+    # Entries in every shard plus any not yet migrated from the flat layout.
+    if not os.path.isdir(root):
+        return
+    for entry in os.scandir(root):
+        if entry.is_dir() and len(entry.name) == SHARD_CHARS:
+            yield from (e for e in os.scandir(entry.path) if e.name.endswith(suffix) and e.is_file())
+        elif entry.name.endswith(suffix) and entry.is_file():
+            yield entry
+def dumps(data):
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+def read_json(path, default=None):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+def atomic_write(path, text):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+def write_json(path, data):
+    atomic_write(path, dumps(data))
+def _lock_file(f):
+    if fcntl:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        return
+    # msvcrt gives up after ten one-second attempts; keep waiting like flock does.
+    while True:
+        try:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            time.sleep(LOCK_RETRY_SECONDS)
+def _unlock_file(f):
+    if fcntl:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+@contextmanager
+def locked(path):
+    # Advisory lock on a sidecar file: writers that take it are serialized across threads and processes,
+    # while readers rely on atomic renames and never wait.
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(f"{path}.lock", "a+b") as f:
+        _lock_file(f)
+        try:
+            yield
+        finally:
+            _unlock_file(f)
+def sqlite_connection(path, schema=()):
+    # One connection per thread and database file. WAL lets readers in other threads and processes proceed while
+    # one writer commits; the schema statements run once, when the thread first opens the file.
+    connections = getattr(_sqlite_local, "connections", None)
+    if connections is None:
+        connections = _sqlite_local.connections = {}
+    conn = connections.get(path)
+    if conn is None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in schema:
+            conn.execute(statement)
+        connections[path] = conn
+    return conn
@@ -0,0 +1,45 @@
+import json
+import os
+from collections import namedtuple
+from functools import lru_cache
+import numpy as np
+# Token counts are modelled as CHARS_COEF * characters + WORDS_COEF * words. The defaults are the
+# conservative len/4 rule; granite tokenizer samples in TOKENIZER_SAMPLES (one {"text", "tokens"}
+# object per line) replace them with a least-squares fit.
+TOKENIZER_SAMPLES = "data/granite_tokenizer_samples.jsonl"
+CHARS_COEF = 0.25
+WORDS_COEF = 0.0
+CONTEXT_SHARE = 0.6
+CACHED_TEXT_CHARS = 4096
+Budget = namedtuple("Budget", ["context", "history", "output"])
+def calibrate(samples):
+    samples = list(samples)
+    if not samples:
+        return CHARS_COEF, WORDS_COEF
+    features = np.array([[len(s["text"]), len(s["text"].split())] for s in samples], dtype=np.float64)
+    targets = np.array([s["tokens"] for s in samples], dtype=np.float64)
+    (chars_coef, words_coef), *_ = np.linalg.lstsq(features, targets, rcond=None)
+    return float(chars_coef), float(words_coef)
+@lru_cache(maxsize=1)
+def coefficients():
+    if not os.path.exists(TOKENIZER_SAMPLES):
+        return CHARS_COEF, WORDS_COEF
+    with open(TOKENIZER_SAMPLES, "r", encoding="utf-8") as f:
+        return calibrate(json.loads(line) for line in f if line.strip())
+def _count(text):
+    chars_coef, words_coef = coefficients()
+    return int(chars_coef * len(text) + (words_coef * len(text.split()) if words_coef else 0))
+_count_cached = lru_cache(maxsize=4096)(_count)
+def count_tokens(text):
+    # Only short texts (chat turns, titles, questions) are memoized so the cache never pins whole documents.
+    return _count_cached(text) if len(text) <= CACHED_TEXT_CHARS else _count(text)
+def prefix_costs(words):
+    # Token cost of the first k words joined by single spaces, for every k.
+    chars_coef, words_coef = coefficients()
+    lengths = np.fromiter((len(w) for w in words), dtype=np.float64, count=len(words))
+    joined = np.cumsum(lengths + 1) - 1
+    return chars_coef * joined + words_coef * np.arange(1, len(words) + 1)
+def plan_budget(total_tokens, output_tokens, fixed_text="", context_share=CONTEXT_SHARE):
+    available = max(total_tokens - output_tokens - count_tokens(fixed_text), 0)
+    context = int(available * context_share)
+    return Budget(context=context, history=available - context, output=output_tokens)
@@ -0,0 +1,172 @@
+import atexit
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from utils import storage
+TRACING = os.getenv("TRACING", "1") != "0"
+TRACE_FILE = os.getenv("TRACE_FILE", "data/traces/histograms.json")
+TRACE_ENDPOINT = os.getenv("TRACE_ENDPOINT")
+FLUSH_SECONDS = 30
+# Upper bounds in milliseconds, roughly 1-2-5 steps up to ten minutes; the last bucket is open-ended.
+BUCKETS_MS = [0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000, 60000, 120000, 600000]
+_lock = threading.Lock()
+_histograms = {}
+_stats = {}
+_flusher = None
+def _new_histogram():
+    return {"count": 0, "errors": 0, "sum_ms": 0.0, "min_ms": None, "max_ms": 0.0, "buckets": [0] * (len(BUCKETS_MS) + 1)}
+def record(name, elapsed_ms, error=False):
+    with _lock:
+        hist = _histograms.get(name)
+        if hist is None:
+            hist = _histograms[name] = _new_histogram()
+        hist["count"] += 1
+        hist["errors"] += error
+        hist["sum_ms"] += elapsed_ms
+        hist["min_ms"] = elapsed_ms if hist["min_ms"] is None else min(hist["min_ms"], elapsed_ms)
+        hist["max_ms"] = max(hist["max_ms"], elapsed_ms)
+        hist["buckets"][bisect.bisect_left(BUCKETS_MS, elapsed_ms)] += 1
+    _start_flusher()
+def percentile(hist, q):
+    # Upper bound of the bucket holding the q-th sample, capped by the largest value actually seen.
+    if not hist["count"]:
+        return 0.0
+    rank = q / 100 * hist["count"]
+    seen = 0
+    for bound, count in zip(BUCKETS_MS + [hist["max_ms"]], hist["buckets"]):
+        seen += count
+        if seen >= rank:
+            return min(bound, hist["max_ms"])
+    return hist["max_ms"]
+@contextmanager
+def span(name):
+    if not TRACING:
+        yield
+        return
+    start = time.perf_counter()
+    error = False
+    try:
+        yield
+    except Exception:
+        error = True
+        raise
+    finally:
+        record(name, (time.perf_counter() - start) * 1000, error)
+def traced(name):
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+def traced_iter(name, iterable):
+    # Generators finish long after the call that created them; the span covers the whole iteration.
+    with span(name):
+        yield from iterable
+def register_stats(name, fn):
+    # Counter snapshots (cache hit rates, pool sizes) exported next to the span histograms.
+    with _lock:
+        _stats[name] = fn
+def collect_stats():
+    with _lock:
+        providers = dict(_stats)
+    stats = {}
+    for name, fn in providers.items():
+        try:
+            stats[name] = fn()
+        except Exception:
+            pass
+    return stats
+def snapshot():
+    with _lock:
+        hists = {name: dict(hist, buckets=list(hist["buckets"])) for name, hist in _histograms.items()}
+    for hist in hists.values():
+        hist["p50_ms"] = percentile(hist, 50)
+        hist["p95_ms"] = percentile(hist, 95)
+        hist["p99_ms"] = percentile(hist, 99)
+    return {"pid": os.getpid(), "time": time.time(), "bucket_bounds_ms": BUCKETS_MS, "spans": hists, "stats": collect_stats()}
+def reset():
+    with _lock:
+        _histograms.clear()
+def export(path=None, endpoint=None):
+    data = snapshot()
+    if not data["spans"]:
+        return data
+    path = path or TRACE_FILE
+    endpoint = endpoint or TRACE_ENDPOINT
+    if path:
+        # One file per process so concurrent workers never overwrite each other's histograms.
+        root, ext = os.path.splitext(path)
+        storage.atomic_write(f"{root}.{os.getpid()}{ext}", json.dumps(data))
+    if endpoint:
+        request = urllib.request.Request(
+            endpoint, data=json.dumps(data).encode("utf-8"), headers={"Content-Type": "application/json"}, method="POST"
+        )
+        try:
+            urllib.request.urlopen(request, timeout=5).close()
+        except OSError:
+            pass
+    return data
+def _flush_loop():
+    while True:
+        time.sleep(FLUSH_SECONDS)
+        try:
+            export()
+        except OSError:
+            pass
+def _start_flusher():
+    global _flusher
+    if _flusher is not None or not (TRACE_FILE or TRACE_ENDPOINT):
+        return
+    with _lock:
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_loop, name="trace-export", daemon=True)
+            _flusher.start()
+            atexit.register(export)
+def _exports(path=None):
+    # The per-process exports written next to TRACE_FILE.
+    root, ext = os.path.splitext(path or TRACE_FILE)
+    directory = os.path.dirname(root) or "."
+    prefix = os.path.basename(root) + "."
+    if not os.path.isdir(directory):
+        return
+    for name in sorted(os.listdir(directory)):
+        if name.startswith(prefix) and name.endswith(ext):
+            with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+                yield json.load(f)
+def load(path=None):
+    merged = {}
+    for data in _exports(path):
+        spans = data["spans"]
+        for span_name, hist in spans.items():
+            total = merged.setdefault(span_name, _new_histogram())
+            total["count"] += hist["count"]
+            total["errors"] += hist["errors"]
+            total["sum_ms"] += hist["sum_ms"]
+            total["min_ms"] = hist["min_ms"] if total["min_ms"] is None else min(total["min_ms"], hist["min_ms"])
+            total["max_ms"] = max(total["max_ms"], hist["max_ms"])
+            total["buckets"] = [a + b for a, b in zip(total["buckets"], hist["buckets"])]
+    return merged
+def report(hists):
+    print(f"{'span':<28} {'count':>7} {'mean':>10} {'p50':>10} {'p95':>10} {'p99':>10}")
+    for name, hist in sorted(hists.items()):
+        mean = hist["sum_ms"] / hist["count"] if hist["count"] else 0.0
+        print(
+            f"{name:<28} {hist['count']:>7} {mean:>8.1f}ms {percentile(hist, 50):>8.1f}ms "
+            f"{percentile(hist, 95):>8.1f}ms {percentile(hist, 99):>8.1f}ms"
+        )
+def load_stats(path=None):
+    # Counters are per process and not all of them add up (hit rates), so they are kept apart by pid.
+    return {data["pid"]: data.get("stats", {}) for data in _exports(path)}
+if __name__ == "__main__":
+    report(load())
+    for pid, stats in load_stats().items():
+        print(f"\npid {pid}")
+        for name, values in sorted(stats.items()):
+            print(f"  {name}: " + ", ".join(f"{k}={v:.3g}" if isinstance(v, float) else f"{k}={v}" for k, v in values.items()))
@@ -0,0 +1,45 @@
+import os
+import threading
+from utils import storage
+USER_DB = "data/users.db"
+LEGACY_USER_FILE = "data/users.json"
+SCHEMA = ("CREATE TABLE IF NOT EXISTS users (email TEXT PRIMARY KEY, password TEXT NOT NULL)",)
+_migrate_lock = threading.Lock()
+_migrated = set()
+def _migrate_legacy(conn, legacy_path):
+    if not os.path.exists(legacy_path):
+        return
+    users = storage.read_json(legacy_path, [])
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.executemany(
+            "INSERT OR IGNORE INTO users (email, password) VALUES (?, ?)",
+            [(user["email"], user["password"]) for user in users]
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    # Another process may have migrated and renamed the file already.
+    try:
+        os.replace(legacy_path, f"{legacy_path}.migrated")
+    except FileNotFoundError:
+        pass
+def get_connection(path=USER_DB, legacy_path=LEGACY_USER_FILE):
+    conn = storage.sqlite_connection(path, SCHEMA)
+    if path not in _migrated:
+        with _migrate_lock:
+            if path not in _migrated:
+                _migrate_legacy(conn, legacy_path)
+                _migrated.add(path)
+    return conn
+def get_password_hash(email):
+    row = get_connection().execute("SELECT password FROM users WHERE email = ?", (email,)).fetchone()
+    return row[0] if row else None
+def add_user(email, password_hash):
+    cursor = get_connection().execute(
+        "INSERT OR IGNORE INTO users (email, password) VALUES (?, ?)", (email, password_hash)
+    )
+    return cursor.rowcount == 1
+def update_password_hash(email, password_hash):
+    get_connection().execute("UPDATE users SET password = ? WHERE email = ?", (password_hash, email))